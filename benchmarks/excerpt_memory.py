@@ -0,0 +1,77 @@
+import random
+import sys
+import tracemalloc
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from music_generator.structures.excerpt import Excerpt
+from music_generator.structures.note_message import MESSAGE_TYPES
+
+# Memory benchmark: packed Excerpt columns against the previous layout
+# (one NoteMessage object with a __dict__ per message, stored in a list).
+# Usage: python benchmarks/excerpt_memory.py [EXCERPTS] [MESSAGES_PER_EXCERPT]
+
+
+class LegacyNoteMessage:
+    '''Note message with the attributes of the previous NoteMessage class.'''
+    def __init__(self, type, channel, note, velocity, time):
+        self.type = type
+        self.channel = channel
+        self.note = note
+        self.velocity = velocity
+        self.time = time
+
+
+class LegacyExcerpt:
+    '''Excerpt with the previous list of message objects.'''
+    def __init__(self, name):
+        self.name = name
+        self.messages = []
+
+
+def random_messages(count, rng):
+    return [(rng.randrange(2), 0, rng.randrange(128), rng.randrange(128), rng.randrange(480)) for _ in range(count)]
+
+
+def measure(build):
+    tracemalloc.start()
+    objects = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, objects
+
+
+def main():
+    number_excerpts = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    number_messages = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    rng = random.Random(0)
+    data = [random_messages(number_messages, rng) for _ in range(number_excerpts)]
+
+    def build_legacy():
+        excerpts = []
+        for i, messages in enumerate(data):
+            excerpt = LegacyExcerpt(f"excerpt_{i}")
+            for type_code, channel, note, velocity, time in messages:
+                excerpt.messages.append(LegacyNoteMessage(MESSAGE_TYPES[type_code], channel, note, velocity, time))
+            excerpts.append(excerpt)
+        return excerpts
+
+    def build_packed():
+        excerpts = []
+        for i, messages in enumerate(data):
+            excerpt = Excerpt(f"excerpt_{i}")
+            for message in messages:
+                excerpt.add_note(*message)
+            excerpts.append(excerpt)
+        return excerpts
+
+    legacy_size, _ = measure(build_legacy)
+    packed_size, _ = measure(build_packed)
+    total = number_excerpts * number_messages
+    print(f"{number_excerpts} excerpts x {number_messages} messages")
+    print(f"Legacy objects: {legacy_size / 2**20:8.2f} MiB ({legacy_size / total:6.1f} bytes/message)")
+    print(f"Packed arrays:  {packed_size / 2**20:8.2f} MiB ({packed_size / total:6.1f} bytes/message)")
+    print(f"Reduction:      {legacy_size / packed_size:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
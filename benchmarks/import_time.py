@@ -0,0 +1,47 @@
+import os
+import subprocess
+import sys
+
+# Import-time benchmark: measures how long a fresh interpreter takes to import the package without the GUI,
+# and checks that no GUI module is loaded.
+# Usage: python benchmarks/import_time.py [BUDGET_SECONDS] [RUNS]
+
+REPO_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GUI_MODULES = ("tkinter", "ttkbootstrap", "music_generator.ui")
+
+MEASURE = f"""
+import sys, time
+start = time.perf_counter()
+import music_generator
+elapsed = time.perf_counter() - start
+loaded = [name for name in {GUI_MODULES!r} if name in sys.modules]
+print(elapsed, ",".join(loaded))
+"""
+
+
+def measure_once():
+    output = subprocess.run([sys.executable, "-c", MEASURE], cwd=REPO_FOLDER, capture_output=True, text=True, check=True).stdout.split()
+    return float(output[0]), output[1] if len(output) > 1 else ""
+
+
+def main():
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else 0.3
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    times = []
+    gui_loaded = set()
+    for _ in range(runs):
+        elapsed, loaded = measure_once()
+        times.append(elapsed)
+        gui_loaded.update(filter(None, loaded.split(",")))
+
+    best = min(times)
+    print(f"import music_generator: best {best * 1000:.1f} ms, median {sorted(times)[len(times) // 2] * 1000:.1f} ms over {runs} runs (budget {budget * 1000:.0f} ms)")
+    if gui_loaded:
+        print(f"GUI modules loaded by a headless import: {', '.join(sorted(gui_loaded))}")
+    if gui_loaded or best > budget:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# Lets pytest import music_generator from the repository root (the package is not installed)
@@ -1,16 +1,26 @@
 import sys
 from music_generator import simple_no_gui_test
-from music_generator import simple_gui_test
+from music_generator import batch_no_gui
+from music_generator import run_cli, run_job_cli
 
 if __name__ == "__main__":
-    print(len(sys.argv))
     if len(sys.argv) > 1 and sys.argv[1] == "--test-generator":
         simple_no_gui_test()
     elif len(sys.argv) > 1 and sys.argv[1] == "--test-gui":
+        # The GUI is only imported when it is used
+        from music_generator import simple_gui_test
         simple_gui_test()
+    elif len(sys.argv) > 1 and sys.argv[1] == "generate":
+        sys.exit(run_cli(sys.argv[2:]))
+    elif len(sys.argv) > 1 and sys.argv[1] == "job":
+        sys.exit(run_job_cli(sys.argv[2:]))
+    elif len(sys.argv) > 2 and sys.argv[1] == "--batch":
+        workers = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+        batch_no_gui(int(sys.argv[2]), workers)
     elif len(sys.argv) == 1:
+        from music_generator import simple_gui_test
         simple_gui_test()
     else:
-        print("Usage: python run.py [--test-generator | --test-gui]")
-        print("Run without arguments for full GUI mode.")
+        print("Usage: python run.py [--test-generator | --test-gui | --batch N [WORKERS] | generate [OPTIONS] | job FILE [OPTIONS]]")
+        print("Run without arguments for full GUI mode, or with \"generate --help\" for the headless options.")
         sys.exit(1)
\ No newline at end of file
@@ -1,32 +1,93 @@
+import importlib
+
 from .structures import(
     Excerpt,
     ExcerptCollection,
+    ExcerptFeatures,
     NoteMessage,
     Track,
     Composition,
     MIDI_INSTRUMENT_TABLE,
-    PROBABILITY_PRESETS_TABLE
+    instrument_program,
+    instrument_name,
+    category_programs,
+    find_instruments,
+    resolve_instrument,
+    PROBABILITY_PRESETS_TABLE,
+    AliasSampler,
+    MarkovChain,
+    PitchClassClash,
+    DensityCap,
+    draw_tracks,
+    Distribution,
+    distribution,
+    register_distribution
 )
 
 from .files import(
     import_excerpts,
+    import_excerpts_parallel,
+    stream_excerpts,
     export_file,
-    generate
+    export_file_compiled,
+    export_file_mido,
+    set_default_export_backend,
+    generate,
+    generate_bytes,
+    choose_excerpts,
+    export_bytes,
+    export_to_stream,
+    read_seed,
+    generate_batch,
+    generate_parallel,
+    load_job,
+    run_job,
+    convert_folder_to_corpus,
+    write_corpus,
+    open_corpus,
+    MappedExcerptCollection,
+    generate_stream,
+    export_stream,
+    GenerationCancelled,
+    set_debug_level,
+    set_debug_sink,
+    folder_sink,
+    stream_sink,
+    DEBUG_OFF,
+    DEBUG_SUMMARY,
+    DEBUG_FULL
 )
 
-from .ui import(
-    create_window,
-    create_notebook,
-    create_notebook_tab,
-    create_octave_list,
-    create_instrument_list,
-    create_probability_table,
-    create_boxes,
-    create_button,
-    create_controls
-)
+# The GUI (tkinter, ttkbootstrap) and the entry points are only imported when first used,
+# so headless scripts start faster and work on servers without a display or tk.
+_LAZY_SYMBOLS = {
+    "create_window": ".ui",
+    "create_notebook": ".ui",
+    "create_notebook_tab": ".ui",
+    "create_octave_list": ".ui",
+    "create_instrument_list": ".ui",
+    "create_probability_table": ".ui",
+    "create_boxes": ".ui",
+    "create_button": ".ui",
+    "create_controls": ".ui",
+    "GenerationQueue": ".ui",
+    "simple_no_gui_test": ".main",
+    "simple_gui_test": ".main",
+    "batch_no_gui": ".main",
+    "run_cli": ".main",
+    "run_job_cli": ".main"
+}
 
-from .main import(
-    simple_no_gui_test,
-    simple_gui_test
-)
+def __getattr__(name):
+    """
+    Imports a lazy symbol the first time it is accessed.
+    """
+    module_name = _LAZY_SYMBOLS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_SYMBOLS))
@@ -1,5 +1,43 @@
-from .import_excerpts import import_excerpts
+from .import_excerpts import (
+    import_excerpts,
+    import_excerpts_parallel,
+    stream_excerpts
+)
 from .export_file import (
     export_file,
-    generate
-)
\ No newline at end of file
+    export_file_compiled,
+    export_file_mido,
+    set_default_export_backend,
+    generate,
+    generate_bytes,
+    choose_excerpts,
+    export_bytes,
+    export_to_stream,
+    read_seed
+)
+from .batch_generate import generate_batch
+from .parallel_generate import generate_parallel
+from .job_file import (
+    load_job,
+    run_job
+)
+from .corpus_file import (
+    convert_folder_to_corpus,
+    write_corpus,
+    open_corpus,
+    MappedExcerptCollection
+)
+from .stream_export import (
+    generate_stream,
+    export_stream,
+    GenerationCancelled
+)
+from .debug_trace import (
+    set_debug_level,
+    set_debug_sink,
+    folder_sink,
+    stream_sink,
+    DEBUG_OFF,
+    DEBUG_SUMMARY,
+    DEBUG_FULL
+)
@@ -0,0 +1,61 @@
+import os
+from music_generator.structures.constraints import draw_tracks
+from music_generator.files.export_file import clean_file_name
+from music_generator.files.smf_writer import compile_excerpt, encode_track_header, encode_track, encode_header, write_smf
+
+def generate_batch(composition, tracks, count, output_folder="output", start=0, seed=None, digits=None):
+
+    """
+    Generates several aleatoric compositions from the same composition template and tracks.
+    The tracks are only read, so the imported excerpts are shared by every generated file.
+    The file with index i is generated with the seed seed + i (saved in the file), exactly as generate() would with that seed.
+
+    Parameters:
+        composition: The composition object used as a template (name, bpm, length and number of tracks).
+        tracks: A list of track objects, each containing excerpts and probabilities.
+        count: The number of compositions to generate.
+        output_folder: The folder where the MIDI files will be saved.
+        start: The index of the first file, used to number the generated files.
+        seed: The seed of the first file. Defaults to the seed of the composition (a random one if it is None).
+        digits: The number of digits used to number the files. Defaults to the digits of the last index.
+
+    Returns:
+        file_paths: A list with the paths of the generated MIDI files.
+    """
+
+    # Prepare everything that does not change between files
+    used_tracks = tracks[:composition.max_tracks]
+    headers = [encode_track_header(composition, track, False) for track in used_tracks]
+    midi_header = encode_header(len(used_tracks))
+
+    name = clean_file_name(composition.name)
+    if seed is None:
+        seed = composition.generation_seed()
+    if digits is None:
+        digits = len(str(start + count - 1))
+    os.makedirs(output_folder, exist_ok=True)
+
+    file_paths = []
+    for i in range(start, start + count):
+        file_seed = seed + i
+        rngs = composition.random_generators(file_seed)
+        chunks = [midi_header]
+        indexes = draw_tracks(used_tracks, composition.length, rngs, composition.constraints)
+        for n in range(len(used_tracks)):
+            # Concatenate the compiled bytes of the chosen excerpts only (compile_excerpt caches them in each excerpt,
+            # so a large corpus is never compiled, or built from a corpus file, as a whole)
+            track = used_tracks[n]
+            excerpts = track.input_excerpts.excerpts
+            chosen_excerpts = (compile_excerpt(excerpts[i], track.note_shift) for i in indexes[n].tolist())
+            if n == 0:
+                # The first track holds the global meta messages, including the seed of the file
+                header = encode_track_header(composition, used_tracks[0], True, file_seed)
+            else:
+                header = headers[n]
+            chunks.append(encode_track(header, chosen_excerpts))
+
+        file_path = os.path.join(output_folder, f"{name}_{i:0{digits}d}.mid")
+        write_smf(file_path, chunks)
+        file_paths.append(file_path)
+
+    return file_paths
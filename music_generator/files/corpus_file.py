@@ -0,0 +1,228 @@
+import mmap
+import os
+import struct
+from array import array
+import numpy as np
+from music_generator.structures import Excerpt, ExcerptCollection
+from music_generator.files.import_excerpts import import_excerpts_parallel
+
+# Layout of a corpus file (all numbers little-endian):
+#   header:  magic, version, number of excerpts, number of messages, size of the names block
+#   index:   one INDEX_DTYPE entry per excerpt
+#   names:   the utf-8 names of the excerpts, one after the other
+#   columns: types, channels, notes, velocities (1 byte per message) and times (4 bytes per message, aligned)
+CORPUS_MAGIC = b'MGCORPUS'
+CORPUS_VERSION = 1
+HEADER_FORMAT = '<8sIIQQ'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+INDEX_DTYPE = np.dtype([('start', '<u8'), ('count', '<u4'), ('name_start', '<u8'), ('name_length', '<u4')])
+
+
+def convert_folder_to_corpus(folder_path, corpus_path, workers=None):
+
+    """
+    Imports all MIDI files in a folder and writes them to a corpus file.
+
+    Parameters:
+        folder_path: The path where the MIDI files are stored.
+        corpus_path: The path of the corpus file.
+        workers: The number of worker processes used to import the files.
+
+    Returns:
+        None
+    """
+
+    write_corpus(import_excerpts_parallel(folder_path, workers), corpus_path)
+
+
+def write_corpus(excerpt_collection, corpus_path):
+
+    """
+    Writes an excerpt collection to a corpus file.
+
+    Parameters:
+        excerpt_collection: The ExcerptCollection to be written.
+        corpus_path: The path of the corpus file.
+
+    Returns:
+        None
+    """
+
+    excerpts = excerpt_collection.excerpts
+    names = [excerpt.name.encode('utf-8') for excerpt in excerpts]
+
+    # Build the index
+    index = np.zeros(len(excerpts), dtype=INDEX_DTYPE)
+    index['count'] = [len(excerpt) for excerpt in excerpts]
+    index['start'][1:] = np.cumsum(index['count'], dtype=np.uint64)[:-1]
+    index['name_length'] = [len(name) for name in names]
+    index['name_start'][1:] = np.cumsum(index['name_length'], dtype=np.uint64)[:-1]
+    number_messages = int(index['count'].sum())
+    names_block = b''.join(names)
+
+    header = struct.pack(HEADER_FORMAT, CORPUS_MAGIC, CORPUS_VERSION, len(excerpts), number_messages, len(names_block))
+
+    folder = os.path.dirname(corpus_path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    with open(corpus_path, 'wb') as file:
+        file.write(header)
+        file.write(index.tobytes())
+        file.write(names_block)
+        for column in ('types', 'channels', 'notes', 'velocities'):
+            for excerpt in excerpts:
+                file.write(getattr(excerpt, column).tobytes())
+        file.write(b'\x00' * _padding(file.tell()))
+        for excerpt in excerpts:
+            file.write(np.asarray(excerpt.times, dtype='<u4').tobytes())
+
+
+def open_corpus(corpus_path):
+
+    """
+    Opens a corpus file with mmap.
+
+    Parameters:
+        corpus_path: The path of the corpus file.
+
+    Returns:
+        A MappedExcerptCollection with the excerpts of the corpus.
+    """
+
+    return MappedExcerptCollection(corpus_path)
+
+
+class MappedExcerptCollection(ExcerptCollection):
+
+    """
+    Represents an excerpt collection stored in a memory-mapped corpus file.
+    Excerpts are only built when they are accessed, and processes opening the same file share its pages.
+    Attributes:
+        corpus_path (str): Path of the corpus file.
+        excerpts (MappedExcerptList): Lazy sequence of the excerpts in the corpus.
+        index (ndarray): Start, number of messages and name of each excerpt.
+        types, channels, notes, velocities, times (ndarray): Columns with the messages of all the excerpts.
+    Methods:
+        lowest_note(): Returns the lowest note of all the excerpts in the corpus.
+        message_columns(): Returns the message columns of all the excerpts, without building them.
+    """
+
+    def __init__(self, corpus_path):
+        '''
+        Opens the corpus file and maps its columns.
+        '''
+        self.corpus_path = corpus_path
+        with open(corpus_path, 'rb') as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, number_excerpts, number_messages, names_size = struct.unpack_from(HEADER_FORMAT, self._mmap, 0)
+        if magic != CORPUS_MAGIC or version != CORPUS_VERSION:
+            raise ValueError(f"{corpus_path} is not a corpus file (version {CORPUS_VERSION})")
+
+        offset = HEADER_SIZE
+        self.index = np.frombuffer(self._mmap, dtype=INDEX_DTYPE, count=number_excerpts, offset=offset)
+        offset += self.index.nbytes
+        self._names = np.frombuffer(self._mmap, dtype=np.uint8, count=names_size, offset=offset)
+        offset += names_size
+        for column in ('types', 'channels', 'notes', 'velocities'):
+            setattr(self, column, np.frombuffer(self._mmap, dtype=np.uint8, count=number_messages, offset=offset))
+            offset += number_messages
+        offset += _padding(offset)
+        self.times = np.frombuffer(self._mmap, dtype='<u4', count=number_messages, offset=offset)
+
+        self.name = os.path.splitext(os.path.basename(corpus_path))[0]
+        self.excerpts = MappedExcerptList(self)
+        self._lowest_note = None
+        self._features = None
+
+    def __reduce__(self):
+        '''
+        Pickles the collection as its path, so worker processes map the same file instead of copying the excerpts.
+        '''
+        return (open_corpus, (self.corpus_path,))
+
+    def add_excerpt(self, excerpt):
+        '''
+        Corpus files are read-only.
+        '''
+        raise TypeError("Excerpts cannot be added to a corpus file")
+
+    def lowest_note(self):
+        '''
+        Returns the lowest note of all the excerpts in the corpus, or None if there are no messages.
+        '''
+        if self._lowest_note is None and len(self.notes):
+            self._lowest_note = int(self.notes.min())
+        return self._lowest_note
+
+    def message_columns(self):
+        '''
+        Returns the number of messages of each excerpt and the types, notes, velocities and times of all the messages,
+        read directly from the mapped columns.
+        '''
+        return self.index['count'].astype(np.int64), self.types, self.notes, self.velocities, self.times
+
+    def excerpt_name(self, i):
+        '''
+        Returns the name of an excerpt without building it.
+        '''
+        entry = self.index[i]
+        start = int(entry['name_start'])
+        return self._names[start:start + int(entry['name_length'])].tobytes().decode('utf-8')
+
+    def build_excerpt(self, i):
+        '''
+        Builds the Excerpt object with the messages of an excerpt.
+        '''
+        entry = self.index[i]
+        start = int(entry['start'])
+        end = start + int(entry['count'])
+        excerpt = Excerpt(self.excerpt_name(i))
+        excerpt.types = array('B', self.types[start:end].tobytes())
+        excerpt.channels = array('B', self.channels[start:end].tobytes())
+        excerpt.notes = array('B', self.notes[start:end].tobytes())
+        excerpt.velocities = array('B', self.velocities[start:end].tobytes())
+        excerpt.times = array('I', self.times[start:end].astype(np.uint32).tobytes())
+        return excerpt
+
+
+class MappedExcerptList:
+
+    """
+    Lazy sequence of the excerpts of a MappedExcerptCollection. Each excerpt is built the first time it is accessed
+    and then kept, so it is always the same object (and keeps its compiled cache).
+    """
+
+    def __init__(self, collection):
+        '''
+        Initializes the lazy list of a collection.
+        '''
+        self._collection = collection
+        self._excerpts = [None] * len(collection.index)
+
+    def __len__(self):
+        return len(self._excerpts)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        excerpt = self._excerpts[i]
+        if excerpt is None:
+            if i < 0:
+                i += len(self)
+            excerpt = self._collection.build_excerpt(i)
+            self._excerpts[i] = excerpt
+        return excerpt
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+def _padding(offset):
+
+    """
+    Returns the number of bytes needed to align an offset to 4 bytes.
+    """
+
+    return -offset % 4
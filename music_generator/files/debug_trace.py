@@ -0,0 +1,127 @@
+import os
+import warnings
+
+# Debug levels. Dumps are only produced when their level is not above the current level.
+DEBUG_OFF = 0
+DEBUG_SUMMARY = 1   # One line per imported folder or exported file
+DEBUG_FULL = 2      # Full text dump of every MIDI file read or written
+
+
+def _environment_level():
+
+    """
+    Returns the debug level set with the MUSIC_GENERATOR_DEBUG environment variable. An invalid value only gives
+    a warning (debugging is off), so it never stops the package from being imported.
+    """
+
+    value = os.environ.get("MUSIC_GENERATOR_DEBUG", "").strip()
+    if not value:
+        return DEBUG_OFF
+    try:
+        return int(value)
+    except ValueError:
+        warnings.warn(f"Ignoring invalid MUSIC_GENERATOR_DEBUG value {value!r} (expected {DEBUG_OFF}, {DEBUG_SUMMARY} or {DEBUG_FULL})")
+        return DEBUG_OFF
+
+
+# Current level and sink. The level can also be set with the MUSIC_GENERATOR_DEBUG environment variable.
+_debug_settings = {
+    "level": _environment_level(),
+    "sink": None
+}
+
+
+def set_debug_level(level):
+
+    """
+    Sets the debug level (DEBUG_OFF, DEBUG_SUMMARY or DEBUG_FULL).
+
+    Parameters:
+        level: The new debug level.
+
+    Returns:
+        None
+    """
+
+    _debug_settings["level"] = level
+
+
+def set_debug_sink(sink):
+
+    """
+    Sets where the debug dumps are written.
+
+    Parameters:
+        sink: A callable sink(name, text). Use None for the default, which writes each dump to debug/<name>.txt.
+
+    Returns:
+        None
+    """
+
+    _debug_settings["sink"] = sink
+
+
+def debug_enabled(level):
+
+    """
+    Returns whether dumps of a given level are produced.
+    """
+
+    return level <= _debug_settings["level"]
+
+
+def debug_dump(level, name, producer):
+
+    """
+    Writes a debug dump if its level is enabled. The text is only built (by calling producer) when it is written,
+    so disabled dumps cost a single comparison.
+
+    Parameters:
+        level: The level of the dump.
+        name: The name of the dump (e.g. "debug_output").
+        producer: A callable without arguments that returns the text of the dump.
+
+    Returns:
+        None
+    """
+
+    if level > _debug_settings["level"]:
+        return
+    sink = _debug_settings["sink"] or folder_sink("debug")
+    sink(name, producer())
+
+
+def folder_sink(folder):
+
+    """
+    Creates a sink that writes each dump to <folder>/<name>.txt, replacing the previous dump with the same name.
+
+    Parameters:
+        folder: The folder where the dumps are written.
+
+    Returns:
+        The sink.
+    """
+
+    def sink(name, text):
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, f"{name}.txt"), mode='w', encoding="utf-8") as file:
+            print(text, file=file)
+    return sink
+
+
+def stream_sink(stream):
+
+    """
+    Creates a sink that writes every dump to a text stream (e.g. sys.stderr), prefixed by its name.
+
+    Parameters:
+        stream: The text stream.
+
+    Returns:
+        The sink.
+    """
+
+    def sink(name, text):
+        print(f"[{name}] {text}", file=stream)
+    return sink
@@ -1,9 +1,12 @@
 from mido import MidiFile, MidiTrack, Message, MetaMessage, bpm2tempo
-import random
+from music_generator.structures.note_message import MESSAGE_TYPES
+from music_generator.structures.constraints import draw_tracks
+from music_generator.files.debug_trace import debug_dump, DEBUG_SUMMARY, DEBUG_FULL
+from music_generator.files.smf_writer import compile_excerpt, encode_track_header, encode_track, encode_header, encode_text, write_smf, SEED_PREFIX
 import os
 import re
 
-def generate(composition, tracks):
+def generate(composition, tracks, output_folder="output"):
 
     """
     Generates an aleatoric composition based on the provided composition and tracks parameters.
@@ -11,9 +14,52 @@ def generate(composition, tracks):
     Parameters:
         composition: The composition object containing metadata and track information.
         tracks: A list of track objects, each containing excerpts and probabilities.
+        output_folder: The folder where the MIDI file will be saved.
     
     Returns:
-        None
+        seed: The seed used in the generation, also saved in the MIDI file.
+    """
+
+    seed = choose_excerpts(composition, tracks)
+
+    # Set the name of the composition
+    composition.name=clean_file_name(composition.name)
+
+    # Export the composition to a MIDI file
+    file_path = os.path.join(output_folder, f"{composition.name}.mid")
+    export_file(file_path, composition, seed)
+    return seed
+
+
+def generate_bytes(composition, tracks):
+
+    """
+    Generates an aleatoric composition and returns the MIDI file in memory, without using the filesystem.
+
+    Parameters:
+        composition: The composition object containing metadata and track information.
+        tracks: A list of track objects, each containing excerpts and probabilities.
+
+    Returns:
+        data: The bytes of the MIDI file.
+        seed: The seed used in the generation, also saved in the MIDI file.
+    """
+
+    seed = choose_excerpts(composition, tracks)
+    return export_bytes(composition, seed), seed
+
+
+def choose_excerpts(composition, tracks):
+
+    """
+    Chooses the excerpts of each track based on the probabilities and adds the tracks to the composition.
+
+    Parameters:
+        composition: The composition object containing metadata and track information.
+        tracks: A list of track objects, each containing excerpts and probabilities.
+
+    Returns:
+        seed: The seed used to choose the excerpts.
     """
 
     # Clear previous generations
@@ -21,29 +67,71 @@ def generate(composition, tracks):
     for track in tracks:
         track.excerpts = []  
 
-    # Generate excerpts for each track based on the probabilities
+    # Generate excerpts for each track based on the probabilities, each track with its own random stream
+    seed = composition.generation_seed()
+    rngs = composition.random_generators(seed)
+    indexes = draw_tracks(tracks[:composition.max_tracks], composition.length, rngs, composition.constraints)
     for n in range(composition.max_tracks):
-        chosen_excerpts = random.choices(tracks[n].input_excerpts.excerpts, weights=tracks[n].probabilities, k=composition.length)
+        input_excerpts = tracks[n].input_excerpts.excerpts
+        chosen_excerpts = [input_excerpts[i] for i in indexes[n].tolist()]
         for chosen_excerpt in chosen_excerpts:
             tracks[n].add_excerpt(chosen_excerpt)        
         composition.add_track(tracks[n])
+    return seed
 
-    # Set the name of the composition
-    composition.name=re.sub(r'[^A-Za-z0-9_\-\.]', '_', composition.name)
 
-    # Export the composition to a MIDI file
-    file_path = os.path.join("output", f"{composition.name}.mid")
-    export_file(file_path, composition)
+def export_file(file_path, composition, seed=None, backend=None):
 
+    """
+    Exports a composition to a MIDI file.
+
+    Parameters:
+        file_path: The path where the MIDI file will be saved.
+        composition: The composition object containing the tracks.
+        seed: The seed used to generate the composition, saved in a text meta message. Not saved if None.
+        backend: The name of the writer ("smf" or "mido"). Defaults to the default backend (see set_default_export_backend).
+
+    Returns:
+        None
+    """
+
+    if backend is None:
+        backend = _export_settings["backend"]
+    if backend not in EXPORT_BACKENDS:
+        raise ValueError(f"Unknown export backend: {backend}")
+    EXPORT_BACKENDS[backend](file_path, composition, seed)
+
+    # Debug txt with data from the midi file, only built if enabled
+    debug_dump(DEBUG_FULL, "debug_output", lambda: str(MidiFile(file_path)))
+    debug_dump(DEBUG_SUMMARY, "export", lambda: f"Exported {file_path} ({backend}, {len(composition.tracks)} tracks, {composition.length} bars, seed {seed})")
+
+
+def set_default_export_backend(backend):
+
+    """
+    Sets the writer used by export_file when no backend is given.
+
+    Parameters:
+        backend: The name of the writer: "smf" (direct byte writer, the default) or "mido".
+
+    Returns:
+        None
+    """
+
+    if backend not in EXPORT_BACKENDS:
+        raise ValueError(f"Unknown export backend: {backend}")
+    _export_settings["backend"] = backend
 
-def export_file(file_path, composition):
+
+def export_file_mido(file_path, composition, seed=None):
     
     """
-    Exports a composition to a MIDI file.
+    Exports a composition to a MIDI file, building a mido message for every note.
 
     Parameters:
         file_path: The path where the MIDI file will be saved.
         composition: The composition object containing the tracks.
+        seed: The seed used to generate the composition, saved in a text meta message. Not saved if None.
 
     Returns:
         None
@@ -58,43 +146,146 @@ def export_file(file_path, composition):
        
         if composition.tracks.index(t) == 0:
             # Add global meta messages required for the Midi File
-            track = add_composition_meta_messages(track, composition)
+            track = add_composition_meta_messages(track, composition, seed)
         
         # Add track meta messages
         track = add_track_meta_messages(track, t)
         
         # Add note messages
         for e in t.excerpts:
-            for msg in e.messages:
-                track.append(Message(type=msg.type, channel=msg.channel, note=msg.note, velocity=msg.velocity, time=msg.time))
+            notes = e.transposed_notes(t.note_shift).tolist()
+            for type_code, channel, note, velocity, time in zip(e.types, e.channels, notes, e.velocities, e.times):
+                track.append(Message(type=MESSAGE_TYPES[type_code], channel=channel, note=note, velocity=velocity, time=time))
         
         track.append(MetaMessage('end_of_track', time=1))
         mid.tracks.append(track)
 
-    # Debug txt with data from the midi file
-    print(mid, file=open(os.path.join("debug", "debug_output.txt"), mode='w', encoding="utf-8"))
-
     # Save the midi file
     os.makedirs(os.path.dirname(file_path), exist_ok=True)
     mid.save(file_path)
 
 
-def add_composition_meta_messages(output, composition):
+def export_file_compiled(file_path, composition, seed=None):
+
+    """
+    Exports a composition to a MIDI file by encoding the meta messages directly to bytes and concatenating
+    the compiled bytes of its excerpts, instead of building a mido message for every note.
+
+    Parameters:
+        file_path: The path where the MIDI file will be saved.
+        composition: The composition object containing the tracks.
+        seed: The seed used to generate the composition, saved in a text meta message. Not saved if None.
+
+    Returns:
+        None
+    """
+
+    write_smf(file_path, encode_composition(composition, seed))
+
+
+def export_bytes(composition, seed=None):
+
     """
-    Adds time signature and tempo messages.
+    Exports a composition to a MIDI file in memory.
+
+    Parameters:
+        composition: The composition object containing the tracks.
+        seed: The seed used to generate the composition, saved in a text meta message. Not saved if None.
+
+    Returns:
+        The bytes of the MIDI file.
+    """
+
+    return b''.join(encode_composition(composition, seed))
+
+
+def export_to_stream(file, composition, seed=None):
+
+    """
+    Writes a composition as a MIDI file to any writable binary file-like object (an HTTP response, a zip entry, a BytesIO...).
+    The object does not need to be seekable and no temporary file is created.
+
+    Parameters:
+        file: The binary file-like object.
+        composition: The composition object containing the tracks.
+        seed: The seed used to generate the composition, saved in a text meta message. Not saved if None.
+
+    Returns:
+        None
+    """
+
+    for chunk in encode_composition(composition, seed):
+        file.write(chunk)
+
+
+def encode_composition(composition, seed=None):
+
+    """
+    Encodes a composition as the chunks of a MIDI file.
+
+    Parameters:
+        composition: The composition object containing the tracks.
+        seed: The seed used to generate the composition, saved in a text meta message. Not saved if None.
+
+    Returns:
+        chunks: A list with the MThd chunk followed by one MTrk chunk per track.
+    """
+
+    chunks = [encode_header(len(composition.tracks))]
+    for n, t in enumerate(composition.tracks):
+        header = encode_track_header(composition, t, n == 0, seed)
+        chunks.append(encode_track(header, (compile_excerpt(e, t.note_shift) for e in t.excerpts)))
+    return chunks
+
+
+def clean_file_name(name):
+    """
+    Replaces every character that is not safe in a file name with an underscore.
+
+    Parameters:
+        name: The name to be cleaned.
+
+    Returns:
+        The cleaned name.
+    """
+    return re.sub(r'[^A-Za-z0-9_\-\.]', '_', name)
+
+
+def add_composition_meta_messages(output, composition, seed=None):
+    """
+    Adds time signature and tempo messages, and a text message with the seed of the generation.
 
     Parameters:
         output: The track where the messages will be added.
         composition: The composition object containing the tracks.
+        seed: The seed used to generate the composition. Not saved if None.
 
     Returns:
         output: The track with added meta messages.
     """
     output.append(MetaMessage('time_signature', numerator=4, denominator=4, clocks_per_click=24, notated_32nd_notes_per_beat=8, time=0))
     output.append(MetaMessage('set_tempo', tempo=bpm2tempo(composition.bpm), time=0))
+    if seed is not None:
+        output.append(MetaMessage('text', text=f"{SEED_PREFIX}{seed}", time=0))
     
     return output
 
+
+def read_seed(file_path):
+    """
+    Reads the seed saved in a generated MIDI file, so the composition can be generated again.
+
+    Parameters:
+        file_path: The path of the MIDI file.
+
+    Returns:
+        seed: The seed, or None if the file has no seed.
+    """
+    for msg in MidiFile(file_path).tracks[0]:
+        if msg.type == 'text' and msg.text.startswith(SEED_PREFIX):
+            return int(msg.text[len(SEED_PREFIX):])
+    return None
+
 def add_track_meta_messages(output, track):
 
     """
@@ -108,7 +299,8 @@ def add_track_meta_messages(output, track):
         output: The track with added meta messages.
     """
     
-    output.append(MetaMessage('track_name', name=track.name, time=0))
+    # mido writes text as latin-1, so characters outside it are replaced (as the smf writer does) instead of failing
+    output.append(MetaMessage('track_name', name=encode_text(track.name).decode('latin-1'), time=0))
     output.append(MetaMessage('key_signature', key='C', time=0))
     output.append(Message('control_change', channel=0, control=121, value=0, time=0))
     output.append(Message('control_change', channel=0, control=100, value=0, time=0))
@@ -126,5 +318,9 @@ def add_track_meta_messages(output, track):
     return output
 
 
-
-
+# Writers available to export_file
+EXPORT_BACKENDS = {
+    "smf": export_file_compiled,
+    "mido": export_file_mido
+}
+_export_settings = {"backend": "smf"}
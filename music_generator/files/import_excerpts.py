@@ -1,7 +1,12 @@
 import os
-from music_generator.structures import Excerpt, ExcerptCollection, NoteMessage
+import pickle
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from music_generator.structures import Excerpt, ExcerptCollection
+from music_generator.files.debug_trace import debug_dump, debug_enabled, DEBUG_SUMMARY, DEBUG_FULL
 from mido import MidiFile
 
+# Bumped whenever the cached Excerpt objects change shape, so caches written by older versions are rebuilt
+EXCERPT_CACHE_VERSION = 1
 
 
 def import_excerpts(folder_path):
@@ -21,6 +26,7 @@ def import_excerpts(folder_path):
 
     # Add a silence excerpt to the collection
     input_excerpts.add_silence_excerpt()
+    dumps = []
     
     # Find all excerpt in all midi files in the specified folder
     for x in sorted(os.listdir(folder_path)): 
@@ -31,14 +37,12 @@ def import_excerpts(folder_path):
             excerpt = Excerpt(x[:-4])
             mid = MidiFile(os.path.join(folder_path, x)) 
 
-            # Print the MIDI file for debugging purposes
-            print(mid, file=open(os.path.join("debug", "debug_input.txt"), mode='w', encoding="utf-8"))  
+            # Keep the MIDI file for debugging purposes
+            if debug_enabled(DEBUG_FULL):
+                dumps.append(str(mid))
 
             # Iterate through all tracks in the MIDI file and add note messages to the excerpt
-            for track in mid.tracks:
-                for msg in track:
-                    if msg.type == 'note_on' or msg.type == 'note_off':
-                        excerpt.add_message(NoteMessage(msg))     
+            add_midi_messages(excerpt, mid)
 
             # Make sure the excerpt is normalized and padded, so that it works correctly in the generator.
             excerpt.normalize()
@@ -46,11 +50,208 @@ def import_excerpts(folder_path):
 
             # Add the excerpt to the ExcerptCollection
             input_excerpts.add_excerpt(excerpt)
+
+    # Index the features of all the excerpts at once
+    input_excerpts.features()
+
+    debug_dump(DEBUG_FULL, "debug_input", lambda: "\n".join(dumps))
+    debug_dump(DEBUG_SUMMARY, "import", lambda: f"Imported {len(input_excerpts.excerpts) - 1} excerpts from {folder_path}")
     return input_excerpts
 
 
+def import_excerpts_parallel(folder_path, workers=None, cache_path=os.path.join("cache", "excerpt_cache.pickle")):
+
+    """
+    Imports all MIDI files in a folder using a pool of processes and an on-disk cache.
+    The excerpts are added in the same order as import_excerpts (silence first, then sorted by file name).
+
+    Parameters:
+        folder_path: The path where the MIDI files are stored.
+        workers: The number of worker processes. Defaults to the number of CPU cores.
+        cache_path: The path of the cache file. If None the cache is not used.
+
+    Returns:
+        input_excerpts: An ExcerptCollection containing all the imported excerpts.
+    """
+
+    excerpts = dict(stream_excerpts(folder_path, workers, cache_path))
+
+    input_excerpts = ExcerptCollection("Input_Excerpts")
+    input_excerpts.add_silence_excerpt()
+    for file_name in sorted(excerpts):
+        input_excerpts.add_excerpt(excerpts[file_name])
+    input_excerpts.features()
+
+    # The workers and the cache only keep the excerpts, so the MIDI files are read again for the full dump (only if it is enabled)
+    debug_dump(DEBUG_FULL, "debug_input", lambda: "\n".join(str(MidiFile(os.path.join(folder_path, file_name))) for file_name in sorted(excerpts)))
+    debug_dump(DEBUG_SUMMARY, "import", lambda: f"Imported {len(excerpts)} excerpts from {folder_path}")
+    return input_excerpts
+
+
+def stream_excerpts(folder_path, workers=None, cache_path=os.path.join("cache", "excerpt_cache.pickle"), chunk_size=16):
+
+    """
+    Parses all MIDI files in a folder in a pool of processes, yielding each excerpt as soon as it is ready.
+    Parsed excerpts (already normalized and padded) are kept in a cache keyed on the file path, size and
+    modification time, so files that did not change are never parsed again.
+
+    Parameters:
+        folder_path: The path where the MIDI files are stored.
+        workers: The number of worker processes. Defaults to the number of CPU cores.
+        cache_path: The path of the cache file. If None the cache is not used.
+        chunk_size: The number of files parsed by each task.
+
+    Yields:
+        (file_name, excerpt) tuples, in the order they are ready.
+    """
+
+    cache = load_excerpt_cache(cache_path)
+    updated_cache = {}
 
+    # Excerpts found in the cache are ready right away
+    pending = []
+    for x in sorted(os.listdir(folder_path)):
+        if not x.endswith(".mid"):
+            continue
+        file_path = os.path.abspath(os.path.join(folder_path, x))
+        stat = os.stat(file_path)
+        key = (stat.st_size, stat.st_mtime_ns)
+        cached = cache.get(file_path)
+        if cached is not None and cached[0] == key:
+            updated_cache[file_path] = cached
+            yield x, cached[1]
+        else:
+            pending.append((x, file_path, key))
 
+    # The remaining files are parsed by the workers
+    if pending:
+        chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_parse_files, [(x, file_path) for x, file_path, _ in chunk]) for chunk in chunks]
+            keys = {file_path: key for _, file_path, key in pending}
+            for future in as_completed(futures):
+                for x, file_path, excerpt in future.result():
+                    updated_cache[file_path] = (keys[file_path], excerpt)
+                    yield x, excerpt
 
+    if cache_path is not None and (pending or len(updated_cache) != len(cache)):
+        save_excerpt_cache(cache_path, updated_cache)
 
 
+def parse_excerpt(file_path, name):
+
+    """
+    Reads a MIDI file and creates a normalized and padded excerpt with its note messages.
+
+    Parameters:
+        file_path: The path of the MIDI file.
+        name: The name of the excerpt.
+
+    Returns:
+        excerpt: The Excerpt object.
+    """
+
+    excerpt = Excerpt(name)
+    add_midi_messages(excerpt, MidiFile(file_path))
+    excerpt.normalize()
+    excerpt.pad_length()
+    return excerpt
+
+
+def add_midi_messages(excerpt, mid):
+
+    """
+    Adds the note messages of all the tracks of a MIDI file to an excerpt.
+
+    Parameters:
+        excerpt: The Excerpt object.
+        mid: The mido MidiFile.
+
+    Returns:
+        None
+    """
+
+    for track in mid.tracks:
+        for msg in track:
+            if msg.type == 'note_on' or msg.type == 'note_off':
+                excerpt.add_message(msg)
+
+
+def load_excerpt_cache(cache_path):
+
+    """
+    Loads the cache of parsed excerpts. Caches written with another EXCERPT_CACHE_VERSION are discarded.
+
+    Parameters:
+        cache_path: The path of the cache file. If None an empty cache is returned.
+
+    Returns:
+        A dictionary {file_path: ((size, mtime), excerpt)}.
+    """
+
+    if cache_path is None or not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path, 'rb') as file:
+            data = pickle.load(file)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError, TypeError, ValueError):
+        # A broken cache is simply rebuilt
+        return {}
+    if not isinstance(data, dict) or data.get("version") != EXCERPT_CACHE_VERSION:
+        return {}
+    cache = data.get("excerpts")
+    if not isinstance(cache, dict):
+        return {}
+    # Entries that do not look like current excerpts are dropped and parsed again
+    return {file_path: entry for file_path, entry in cache.items()
+            if isinstance(entry, tuple) and len(entry) == 2 and _is_current_excerpt(entry[1])}
+
+
+def save_excerpt_cache(cache_path, cache):
+
+    """
+    Saves the cache of parsed excerpts, tagged with EXCERPT_CACHE_VERSION, replacing the previous file atomically.
+
+    Parameters:
+        cache_path: The path of the cache file.
+        cache: A dictionary {file_path: ((size, mtime), excerpt)}.
+
+    Returns:
+        None
+    """
+
+    folder = os.path.dirname(cache_path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    temporary_path = cache_path + ".tmp"
+    with open(temporary_path, 'wb') as file:
+        pickle.dump({"version": EXCERPT_CACHE_VERSION, "excerpts": cache}, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary_path, cache_path)
+
+
+def _is_current_excerpt(excerpt):
+
+    """
+    Checks that a cached object is an Excerpt with all the message columns of the current version.
+
+    Parameters:
+        excerpt: The cached object.
+
+    Returns:
+        True if the excerpt can be used as it is.
+    """
+
+    return isinstance(excerpt, Excerpt) and all(
+        hasattr(excerpt, attribute) for attribute in ("name", "types", "channels", "notes", "velocities", "times", "compiled"))
+
+
+def _parse_files(files):
+
+    """
+    Parses a list of MIDI files inside a worker process.
+
+    Returns:
+        A list of (file_name, file_path, excerpt) tuples.
+    """
+
+    return [(x, file_path, parse_excerpt(file_path, x[:-4])) for x, file_path in files]
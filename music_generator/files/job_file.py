@@ -0,0 +1,380 @@
+from contextlib import closing
+import hashlib
+import json
+import os
+import time
+import numpy as np
+from music_generator.structures import Composition, Track, PROBABILITY_PRESETS_TABLE, SEEDED_PRESETS, resolve_instrument, PitchClassClash, DensityCap
+from music_generator.files.parallel_generate import generate_shards
+from music_generator.files.export_file import clean_file_name
+from music_generator.files.corpus_file import open_corpus
+from music_generator.files.import_excerpts import import_excerpts_parallel
+
+def load_job(job_path):
+
+    """
+    Reads a job file (.json or .toml) describing many compositions generated from the same corpus.
+
+    A job has the keys:
+        corpus: The folder with the .mid excerpts or a corpus file (default "input").
+        output: The folder where the MIDI files are saved (default "output").
+        workers: The number of worker processes (default: the number of CPU cores).
+        chunk_size: The number of files generated by each task (default 100).
+        compositions: A list of compositions, each with the keys name, bpm, length, count, seed (optional), constraints
+            (optional, see build_constraints) and tracks.
+            Each track has the keys instrument, octave (default 4) and one of preset (default "Uniform"), weights or
+            distribution (a table with the name of the distribution and its parameters, e.g. {name = "zipf", s = 1.5}).
+            A track can also have markov, a table with example sequences of excerpt names or indexes, and optionally
+            their order and smoothing, to choose each excerpt depending on the previous ones (see Track.learn_transitions),
+            and filter, a table with a query of the features of the excerpts (e.g. {max_notes = 8, min_syncopation = 0.5},
+            see ExcerptFeatures.select) to only use the excerpts that match it.
+
+    Parameters:
+        job_path: The path of the job file.
+
+    Returns:
+        The job, as a dictionary.
+    """
+
+    if job_path.endswith(".toml"):
+        import tomllib
+        with open(job_path, 'rb') as file:
+            job = tomllib.load(file)
+    else:
+        with open(job_path, 'r', encoding="utf-8") as file:
+            job = json.load(file)
+
+    if not job.get("compositions"):
+        raise ValueError(f"The job {job_path} has no compositions")
+    names = [config.get("name") for config in job["compositions"]]
+    if None in names or len(set(clean_file_name(name) for name in names)) != len(names):
+        raise ValueError("Every composition of a job needs a different name")
+    return job
+
+
+def build_composition(config, max_tracks):
+
+    """
+    Builds the composition template described by a job entry.
+
+    Parameters:
+        config: The dictionary describing the composition.
+        max_tracks: The number of tracks of the composition.
+
+    Returns:
+        The composition object.
+    """
+
+    composition = Composition()
+    if max_tracks > composition.max_tracks:
+        raise ValueError(f"At most {composition.max_tracks} tracks are allowed in {config['name']}")
+    composition.set_name(config["name"])
+    composition.set_bpm(int(config.get("bpm", 120)))
+    composition.set_length(int(config.get("length", 16)))
+    composition.set_max_tracks(max_tracks)
+    if composition.bpm < 1 or composition.length < 1:
+        raise ValueError(f"bpm and length of {config['name']} must be positive")
+    composition.set_constraints(build_constraints(config.get("constraints", [])))
+    return composition
+
+
+def build_constraints(configs):
+
+    """
+    Builds the constraints between the tracks described by a job entry.
+
+    Parameters:
+        configs: A list of dictionaries, each with a type and its parameters:
+            {"type": "pitch_class_clash", "intervals": [1, 6]} or {"type": "density_cap", "max_notes": 24}.
+
+    Returns:
+        The list of constraints.
+    """
+
+    constraints = []
+    for config in configs:
+        kind = config.get("type")
+        if kind == "pitch_class_clash":
+            constraints.append(PitchClassClash(tuple(config.get("intervals", (1,)))))
+        elif kind == "density_cap":
+            constraints.append(DensityCap(int(config["max_notes"])))
+        else:
+            raise ValueError(f"Unknown constraint: {kind}")
+    return constraints
+
+
+def build_track(input_excerpts, n, instrument, octave=4, preset=None, weights=None, distribution=None, markov=None, query=None, seed=None):
+
+    """
+    Builds a track from an instrument name, an octave and either a probability preset or explicit weights.
+
+    Parameters:
+        input_excerpts: The excerpt collection used by the track.
+        n: The index of the track, used in its default name.
+        instrument: The name of the instrument (see MIDI_INSTRUMENT_TABLE), in any case.
+        octave: The octave of the lowest note of the track (0 to 7).
+        preset: The name of the probability preset (see PROBABILITY_PRESETS_TABLE). Defaults to "Uniform".
+        weights: Explicit weights of the excerpts, normalized to probabilities. Overrides the preset.
+        distribution: A dictionary with the name of a distribution (see the distributions module) and its parameters.
+            Overrides the preset.
+        markov: A dictionary with the example sequences of a Markov chain, and optionally its order and smoothing.
+        query: A dictionary with a query of the features of the excerpts. The excerpts that do not match it get probability 0.
+        seed: The seed of the composition. Random presets and Dirichlet distributions without a seed draw their probabilities
+            from a seed derived from it and the index of the track, so the same seed gives the same files.
+
+    Returns:
+        The track object.
+    """
+
+    instrument, _ = resolve_instrument(instrument)
+    if not isinstance(octave, int) or not 0 <= octave <= 7:
+        raise ValueError(f"Octave must be between 0 and 7: {octave}")
+
+    track = Track(f"Track {n+1}", input_excerpts)
+    track.set_name(instrument)
+    track.set_octave(octave)
+
+    if weights is not None:
+        if len(weights) != len(input_excerpts.excerpts):
+            raise ValueError(f"Expected {len(input_excerpts.excerpts)} weights, got {len(weights)}")
+        total = sum(weights)
+        if total <= 0 or min(weights) < 0:
+            raise ValueError("Weights must be non-negative and not all zero")
+        track.set_probabilities([weight / total for weight in weights])
+    elif distribution is not None:
+        params = dict(distribution)
+        name = params.pop("name", None)
+        if name == "dirichlet" and params.get("seed") is None and seed is not None:
+            params["seed"] = _track_seed(seed, n)
+        try:
+            track.set_distribution(name, **params)
+        except TypeError as error:
+            raise ValueError(f"Invalid parameters of the distribution {name}: {error}")
+    else:
+        preset = preset or "Uniform"
+        if preset not in PROBABILITY_PRESETS_TABLE:
+            raise ValueError(f"Unknown probability preset: {preset}")
+        if preset in SEEDED_PRESETS and seed is not None:
+            SEEDED_PRESETS[preset](track, _track_seed(seed, n))
+        else:
+            PROBABILITY_PRESETS_TABLE[preset](track)
+
+    if query is not None:
+        try:
+            track.filter_probabilities(**query)
+        except TypeError as error:
+            raise ValueError(f"Invalid filter: {error}")
+
+    if markov is not None:
+        track.learn_transitions(markov.get("sequences", []), int(markov.get("order", 1)), float(markov.get("smoothing", 0.0)))
+    return track
+
+
+def load_corpus(corpus_path):
+
+    """
+    Loads the excerpts from a folder of .mid files or from a corpus file.
+
+    Parameters:
+        corpus_path: The folder or the corpus file.
+
+    Returns:
+        The excerpt collection.
+    """
+
+    if os.path.isdir(corpus_path):
+        return import_excerpts_parallel(corpus_path)
+    if os.path.isfile(corpus_path):
+        return open_corpus(corpus_path)
+    raise ValueError(f"Corpus not found: {corpus_path}")
+
+
+def run_job(job_path, workers=None, checkpoint_path=None, progress=None):
+
+    """
+    Runs a job file: every composition of the job is generated count times, in shards spread across a pool of processes.
+    The corpus is imported once and shared by every composition. The completed shards are recorded in a checkpoint file,
+    so running the same job again after a crash only generates the missing files. As in generate_batch, the file with
+    index i of a composition is generated with its seed + i, so a resumed job produces the same files as an uninterrupted one.
+    The checkpoint also records a fingerprint of the corpus, and the job is not resumed (ValueError) if the corpus changed.
+
+    Parameters:
+        job_path: The path of the job file (see load_job).
+        workers: The number of worker processes. Overrides the value of the job.
+        checkpoint_path: The path of the checkpoint file. Defaults to the job path with the extension .checkpoint.json.
+        progress: An optional callable progress(done_files, total_files), called after each shard.
+
+    Returns:
+        A dictionary with the seed of each composition, the number of files generated and skipped, and the time spent.
+    """
+
+    job = load_job(job_path)
+    if workers is None:
+        workers = job.get("workers") or os.cpu_count() or 1
+    chunk_size = int(job.get("chunk_size", 100))
+    output_folder = job.get("output", "output")
+    if checkpoint_path is None:
+        checkpoint_path = os.path.splitext(job_path)[0] + ".checkpoint.json"
+
+    track_configs = [config.get("tracks") or [{"instrument": "Acoustic Grand Piano"}] for config in job["compositions"]]
+    compositions = [build_composition(config, len(tracks)) for config, tracks in zip(job["compositions"], track_configs)]
+
+    # Resume from the checkpoint if it belongs to the same job, otherwise choose the seeds
+    corpus_path = job.get("corpus", "input")
+    fingerprint = corpus_fingerprint(corpus_path)
+    checkpoint = load_checkpoint(checkpoint_path, job_hash(job))
+    if checkpoint is not None and checkpoint.get("corpus") != fingerprint:
+        # The probabilities and excerpt indexes would refer to a different corpus, mixing files that cannot be reproduced
+        raise ValueError(f"The corpus {corpus_path} changed since the checkpoint was written; delete {checkpoint_path} to run the job again")
+    new_checkpoint = checkpoint is None
+    if new_checkpoint:
+        checkpoint = {
+            "job": job_hash(job),
+            "corpus": fingerprint,
+            "seeds": [config.get("seed", composition.generation_seed()) for config, composition in zip(job["compositions"], compositions)],
+            "done": [[] for _ in compositions]
+        }
+
+    # Build the tracks of every composition with the shared corpus (after the seeds, which random presets depend on)
+    input_excerpts = load_corpus(corpus_path)
+    configs = []
+    for config, composition, seed, composition_tracks in zip(job["compositions"], compositions, checkpoint["seeds"], track_configs):
+        tracks = [build_track(input_excerpts, n, track_config["instrument"], track_config.get("octave", 4), track_config.get("preset"), track_config.get("weights"), track_config.get("distribution"), track_config.get("markov"), track_config.get("filter"), seed)
+                  for n, track_config in enumerate(composition_tracks)]
+        configs.append((composition, tracks, int(config.get("count", 1))))
+    if new_checkpoint:
+        save_checkpoint(checkpoint_path, checkpoint)
+
+    shards = []
+    skipped = 0
+    for c, (_, _, count) in enumerate(configs):
+        done = set(checkpoint["done"][c])
+        for start in range(0, count, chunk_size):
+            if start in done:
+                skipped += min(chunk_size, count - start)
+            else:
+                shards.append((c, start, min(chunk_size, count - start)))
+
+    total = sum(count for _, _, count in configs)
+    generated = 0
+    start_time = time.perf_counter()
+    shard_configs = [(composition, tracks, seed, len(str(count - 1))) for (composition, tracks, count), seed in zip(configs, checkpoint["seeds"])]
+    # Closing the results stops the pool right away if recording a shard fails
+    with closing(generate_shards(shard_configs, shards, output_folder, workers)) as results:
+        generated = _record_shards(results, checkpoint, checkpoint_path, skipped, total, progress)
+
+    return {
+        "seeds": {composition.name: seed for (composition, _, _), seed in zip(configs, checkpoint["seeds"])},
+        "files": generated,
+        "skipped": skipped,
+        "seconds": time.perf_counter() - start_time
+    }
+
+
+def _record_shards(results, checkpoint, checkpoint_path, skipped, total, progress):
+
+    """
+    Records every completed shard in the checkpoint, as soon as it is completed.
+
+    Returns:
+        The number of files generated.
+    """
+
+    generated = 0
+    for c, start, paths, _, _ in results:
+        checkpoint["done"][c].append(start)
+        save_checkpoint(checkpoint_path, checkpoint)
+        generated += len(paths)
+        if progress is not None:
+            progress(skipped + generated, total)
+    return generated
+
+
+def job_hash(job):
+
+    """
+    Returns a hash of the contents of a job, used to check that a checkpoint belongs to it.
+    """
+
+    return hashlib.sha256(json.dumps(job, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def corpus_fingerprint(corpus_path):
+
+    """
+    Returns a fingerprint of a corpus, stored in the checkpoint so a job is not resumed with a different corpus:
+    the name, size and modification time of every .mid file of a folder, or the size and modification time of a corpus file.
+
+    Parameters:
+        corpus_path: The folder with the .mid excerpts or the corpus file.
+
+    Returns:
+        A hash of the fingerprint, or None if the corpus does not exist.
+    """
+
+    if os.path.isdir(corpus_path):
+        entries = []
+        for x in sorted(os.listdir(corpus_path)):
+            if x.endswith(".mid"):
+                stat = os.stat(os.path.join(corpus_path, x))
+                entries.append([x, stat.st_size, stat.st_mtime_ns])
+    elif os.path.isfile(corpus_path):
+        stat = os.stat(corpus_path)
+        entries = [stat.st_size, stat.st_mtime_ns]
+    else:
+        return None
+    return hashlib.sha256(json.dumps(entries).encode("utf-8")).hexdigest()
+
+
+def load_checkpoint(checkpoint_path, expected_hash):
+
+    """
+    Reads a checkpoint file.
+
+    Parameters:
+        checkpoint_path: The path of the checkpoint file.
+        expected_hash: The hash of the job being run.
+
+    Returns:
+        The checkpoint, or None if there is no checkpoint or it belongs to a different job.
+    """
+
+    try:
+        with open(checkpoint_path, 'r', encoding="utf-8") as file:
+            checkpoint = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if checkpoint.get("job") != expected_hash:
+        return None
+    return checkpoint
+
+
+def save_checkpoint(checkpoint_path, checkpoint):
+
+    """
+    Writes a checkpoint file atomically, so a crash never leaves it half written.
+
+    Parameters:
+        checkpoint_path: The path of the checkpoint file.
+        checkpoint: The checkpoint dictionary.
+
+    Returns:
+        None
+    """
+
+    folder = os.path.dirname(checkpoint_path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    temporary_path = checkpoint_path + ".tmp"
+    with open(temporary_path, 'w', encoding="utf-8") as file:
+        json.dump(checkpoint, file)
+    os.replace(temporary_path, checkpoint_path)
+
+
+def _track_seed(seed, n):
+
+    """
+    Returns the seed of the random probabilities of the track n of a composition, derived from the seed of the composition.
+    """
+
+    return int(np.random.SeedSequence([seed, n]).generate_state(1)[0])
@@ -0,0 +1,127 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import time
+import os
+from music_generator.files.batch_generate import generate_batch
+
+# State of each worker process, set once by the pool initializer
+_worker_state = {}
+
+def generate_parallel(composition, tracks, count, output_folder="output", workers=None, seed=None, chunk_size=None):
+
+    """
+    Generates several aleatoric compositions in parallel, sharding the files across a pool of processes.
+    The composition and the tracks (with their imported excerpts) are sent once to each worker.
+    Every file has its own random streams, derived from the seed and the index of the file (see generate_batch),
+    so the same seed always produces the same files regardless of the number of workers.
+
+    Parameters:
+        composition: The composition object used as a template (name, bpm, length and number of tracks).
+        tracks: A list of track objects, each containing excerpts and probabilities.
+        count: The number of compositions to generate.
+        output_folder: The folder where the MIDI files will be saved.
+        workers: The number of worker processes. Defaults to the number of CPU cores.
+        seed: The seed of the first file. Defaults to the seed of the composition (a random one if it is None).
+        chunk_size: The number of files generated by each task. Defaults to a quarter of the files per worker.
+
+    Returns:
+        file_paths: A list with the paths of the generated MIDI files.
+        report: A dictionary with the seed and the throughput of each worker.
+    """
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if seed is None:
+        seed = composition.generation_seed()
+    if chunk_size is None:
+        chunk_size = max(1, count // (workers * 4))
+
+    digits = len(str(count - 1))
+    os.makedirs(output_folder, exist_ok=True)
+
+    # Split the files into shards with consecutive indexes, so that names never collide
+    shards = [(start, min(chunk_size, count - start)) for start in range(0, count, chunk_size)]
+
+    shard_paths = {}
+    per_worker = {}
+    start_time = time.perf_counter()
+    for _, start, paths, pid, elapsed in generate_shards([(composition, tracks, seed, digits)], [(0, start, shard_count) for start, shard_count in shards], output_folder, workers):
+        shard_paths[start] = paths
+        stats = per_worker.setdefault(pid, {"files": 0, "seconds": 0.0})
+        stats["files"] += len(paths)
+        stats["seconds"] += elapsed
+    elapsed = time.perf_counter() - start_time
+    file_paths = [path for start in sorted(shard_paths) for path in shard_paths[start]]
+
+    # Throughput of each worker while it was busy
+    for stats in per_worker.values():
+        stats["files_per_second"] = stats["files"] / stats["seconds"] if stats["seconds"] else 0.0
+
+    report = {
+        "seed": seed,
+        "files": len(file_paths),
+        "seconds": elapsed,
+        "files_per_second": len(file_paths) / elapsed if elapsed else 0.0,
+        "workers": per_worker
+    }
+    return file_paths, report
+
+
+def generate_shards(configs, shards, output_folder, workers):
+
+    """
+    Generates shards of files of one or more compositions with generate_batch, in a pool of processes
+    (or in this process if workers is 1). Each composition and its tracks are sent once to each worker.
+    Used by generate_parallel and by the job runner.
+
+    Parameters:
+        configs: A list of (composition, tracks, seed, digits) tuples: the seed of the first file of the composition
+            and the number of digits used to number its files.
+        shards: A list of (config_index, start, count) tuples: the files start to start + count - 1 of a composition.
+        output_folder: The folder where the MIDI files will be saved.
+        workers: The number of worker processes.
+
+    Yields:
+        (config_index, start, paths, pid, seconds) for each shard, in the order they are completed.
+    """
+
+    if workers == 1:
+        _init_worker(configs, output_folder)
+        for shard in shards:
+            yield _generate_shard(*shard)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(configs, output_folder)) as executor:
+        futures = [executor.submit(_generate_shard, *shard) for shard in shards]
+        try:
+            for future in as_completed(futures):
+                yield future.result()
+        except BaseException:
+            # Drop the pending shards after an error or an interruption, or when the results are no longer read
+            executor.shutdown(cancel_futures=True)
+            raise
+
+
+def _init_worker(configs, output_folder):
+
+    """
+    Stores the data shared by all the tasks of a worker process.
+    """
+
+    _worker_state["configs"] = configs
+    _worker_state["output_folder"] = output_folder
+
+
+def _generate_shard(c, start, count):
+
+    """
+    Generates a shard of files of a composition inside a worker process.
+
+    Returns:
+        The index of the composition, the index of the first file, the paths of the generated files,
+        the process id and the time spent.
+    """
+
+    start_time = time.perf_counter()
+    composition, tracks, seed, digits = _worker_state["configs"][c]
+    paths = generate_batch(composition, tracks, count, _worker_state["output_folder"], start, seed, digits)
+    return c, start, paths, os.getpid(), time.perf_counter() - start_time
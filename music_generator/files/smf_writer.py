@@ -0,0 +1,288 @@
+import struct
+import os
+
+# Prefix of the text meta message holding the seed of a generated file
+SEED_PREFIX = "music_generator seed="
+
+# Status bytes of the note messages, indexed by message type code (the channel is added to them)
+NOTE_STATUS = (0x80, 0x90)
+
+END_OF_TRACK = b'\x01\xff\x2f\x00'
+
+# Type bytes of the meta messages
+META_TEXT = 0x01
+META_TRACK_NAME = 0x03
+META_MIDI_PORT = 0x21
+META_SET_TEMPO = 0x51
+META_TIME_SIGNATURE = 0x58
+META_KEY_SIGNATURE = 0x59
+
+# Controller changes at the start of each track, before and after the program change (controller, value)
+TRACK_CONTROLLERS_BEFORE_PROGRAM = ((121, 0), (100, 0), (101, 0), (6, 12), (100, 127), (101, 127))
+TRACK_CONTROLLERS_AFTER_PROGRAM = ((7, 100), (10, 64), (91, 0), (93, 0))
+
+
+def encode_variable_length(value):
+
+    """
+    Encodes an integer as a MIDI variable length quantity.
+
+    Parameters:
+        value: The non-negative integer to be encoded.
+
+    Returns:
+        The encoded bytes.
+    """
+
+    encoded = bytearray([value & 0x7F])
+    value >>= 7
+    while value:
+        encoded.append((value & 0x7F) | 0x80)
+        value >>= 7
+    encoded.reverse()
+    return bytes(encoded)
+
+
+def compile_excerpt(excerpt, shift=0, channel=None):
+
+    """
+    Encodes the note messages of an excerpt as MIDI track data (delta time + status + data bytes).
+    The result is cached in the excerpt, one entry per shift/channel variant, until the excerpt changes.
+
+    Parameters:
+        excerpt: The excerpt object.
+        shift: The number of semitones added to every note (the result is clamped to 0-127).
+        channel: The channel of the messages. Defaults to the channel of each message.
+
+    Returns:
+        compiled: A tuple (first_status, last_status, data, data_without_first_status).
+    """
+
+    key = (shift, channel)
+    compiled = excerpt.compiled.get(key)
+    if compiled is not None:
+        return compiled
+
+    data = bytearray()
+    first_status = None
+    running_status = None
+    first_status_index = 0
+    notes = excerpt.transposed_notes(shift).tolist()
+    for type_code, msg_channel, note, velocity, time in zip(excerpt.types, excerpt.channels, notes, excerpt.velocities, excerpt.times):
+        data += encode_variable_length(time)
+        status = NOTE_STATUS[type_code] | (msg_channel if channel is None else channel)
+        if first_status is None:
+            first_status = status
+            first_status_index = len(data)
+        if status != running_status:
+            data.append(status)
+            running_status = status
+        data.append(note)
+        data.append(velocity)
+
+    data = bytes(data)
+    compiled = (first_status, running_status, data, data[:first_status_index] + data[first_status_index + 1:])
+    excerpt.compiled[key] = compiled
+    return compiled
+
+
+def encode_meta(type_byte, data):
+
+    """
+    Encodes a meta message with delta time 0.
+
+    Parameters:
+        type_byte: The type of the meta message.
+        data: The data bytes of the meta message.
+
+    Returns:
+        The encoded bytes.
+    """
+
+    return b'\x00\xff' + bytes([type_byte]) + encode_variable_length(len(data)) + data
+
+
+def encode_text(text):
+
+    """
+    Encodes the text of a meta message, with the same charset as mido (latin-1).
+    """
+
+    return text.encode('latin-1', errors='replace')
+
+
+def encode_composition_meta(composition, seed=None):
+
+    """
+    Encodes the time signature and tempo messages, and a text message with the seed of the generation.
+    Same messages as export_file.add_composition_meta_messages, without building mido messages.
+
+    Parameters:
+        composition: The composition object.
+        seed: The seed used to generate the composition. Not saved if None.
+
+    Returns:
+        The encoded bytes.
+    """
+
+    tempo = int(round(60 * 1e6 / composition.bpm))
+    if not 0 <= tempo <= 0xFFFFFF:
+        raise ValueError(f"BPM {composition.bpm} is out of range")
+    data = encode_meta(META_TIME_SIGNATURE, bytes([4, 2, 24, 8]))
+    data += encode_meta(META_SET_TEMPO, tempo.to_bytes(3, 'big'))
+    if seed is not None:
+        data += encode_meta(META_TEXT, encode_text(f"{SEED_PREFIX}{seed}"))
+    return data
+
+
+def encode_track_meta(track):
+
+    """
+    Encodes the name, key signature, instrument and other track messages, using running status.
+    Same messages as export_file.add_track_meta_messages, without building mido messages.
+
+    Parameters:
+        track: The track object.
+
+    Returns:
+        The encoded bytes.
+    """
+
+    data = bytearray(encode_meta(META_TRACK_NAME, encode_text(track.name)))
+    data += encode_meta(META_KEY_SIGNATURE, b'\x00\x00')
+    data += b'\x00\xb0' + b'\x00'.join(bytes(controller) for controller in TRACK_CONTROLLERS_BEFORE_PROGRAM)
+    data += b'\x00\xc0' + bytes([track.midi_number])
+    data += b'\x00\xb0' + b'\x00'.join(bytes(controller) for controller in TRACK_CONTROLLERS_AFTER_PROGRAM)
+    data += encode_meta(META_MIDI_PORT, b'\x00')
+    return bytes(data)
+
+
+def encode_track_header(composition, track, first, seed=None):
+
+    """
+    Encodes the messages placed at the start of a track. The header ends with a meta message, so no running status is in effect after it.
+
+    Parameters:
+        composition: The composition object.
+        track: The track object.
+        first: Whether the track is the first of the composition, which also holds the global meta messages.
+        seed: The seed used to generate the composition. Not saved if None.
+
+    Returns:
+        The encoded bytes.
+    """
+
+    if first:
+        return encode_composition_meta(composition, seed) + encode_track_meta(track)
+    return encode_track_meta(track)
+
+
+def encode_track(header, compiled_excerpts):
+
+    """
+    Builds a MTrk chunk by concatenating the header data and the compiled excerpts.
+
+    Parameters:
+        header: The encoded messages placed at the start of the track (see encode_track_header).
+        compiled_excerpts: An iterable of compiled excerpts (see compile_excerpt).
+
+    Returns:
+        The encoded chunk.
+    """
+
+    running_status = None
+    parts = [header]
+    for first_status, last_status, data, data_without_first_status in compiled_excerpts:
+        if first_status is None:
+            continue
+        parts.append(data_without_first_status if first_status == running_status else data)
+        running_status = last_status
+    parts.append(END_OF_TRACK)
+    data = b''.join(parts)
+    return b'MTrk' + struct.pack('>L', len(data)) + data
+
+
+def write_track_stream(file, header, compiled_excerpts, buffer_size=65536):
+
+    """
+    Writes a MTrk chunk to a seekable binary file while the compiled excerpts are produced,
+    patching the chunk length at the end. Only buffer_size bytes are kept in memory.
+
+    Parameters:
+        file: The binary file, opened for writing and seekable.
+        header: The encoded messages placed at the start of the track (see encode_track_header).
+        compiled_excerpts: An iterable (usually a generator) of compiled excerpts (see compile_excerpt).
+        buffer_size: The number of bytes gathered before each write.
+
+    Returns:
+        None
+    """
+
+    length_position = file.tell() + 4
+    file.write(b'MTrk\x00\x00\x00\x00')
+    file.write(header)
+    length = len(header)
+
+    running_status = None
+    parts = []
+    buffered = 0
+    for first_status, last_status, data, data_without_first_status in compiled_excerpts:
+        if first_status is None:
+            continue
+        part = data_without_first_status if first_status == running_status else data
+        running_status = last_status
+        parts.append(part)
+        buffered += len(part)
+        if buffered >= buffer_size:
+            file.write(b''.join(parts))
+            length += buffered
+            parts = []
+            buffered = 0
+    parts.append(END_OF_TRACK)
+    file.write(b''.join(parts))
+    length += buffered + len(END_OF_TRACK)
+
+    if length > 0xFFFFFFFF:
+        raise ValueError("The track is too long for a MIDI file (more than 4 GiB)")
+
+    # Go back and write the length of the chunk
+    end_position = file.tell()
+    file.seek(length_position)
+    file.write(struct.pack('>L', length))
+    file.seek(end_position)
+
+
+def encode_header(number_tracks, ticks_per_beat=480):
+
+    """
+    Builds the MThd chunk of a type 1 MIDI file.
+
+    Parameters:
+        number_tracks: The number of tracks in the file.
+        ticks_per_beat: The resolution of the file.
+
+    Returns:
+        The encoded chunk.
+    """
+
+    return b'MThd' + struct.pack('>LHHH', 6, 1, number_tracks, ticks_per_beat)
+
+
+def write_smf(file_path, chunks):
+
+    """
+    Writes the chunks of a MIDI file to disk.
+
+    Parameters:
+        file_path: The path where the MIDI file will be saved.
+        chunks: The list of encoded chunks (header first).
+
+    Returns:
+        None
+    """
+
+    folder = os.path.dirname(file_path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    with open(file_path, 'wb') as file:
+        file.write(b''.join(chunks))
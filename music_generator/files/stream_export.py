@@ -0,0 +1,126 @@
+import os
+from music_generator.structures.constraints import draw_tracks
+from music_generator.files.export_file import clean_file_name
+from music_generator.files.smf_writer import compile_excerpt, encode_track_header, encode_header, write_track_stream
+
+# Number of excerpts written between two calls of the progress callback
+PROGRESS_INTERVAL = 1024
+
+
+class GenerationCancelled(Exception):
+    '''Raised by a progress callback to stop a generation. The partially written file is removed.'''
+
+
+def generate_stream(composition, tracks, output_folder="output", block_size=4096):
+
+    """
+    Generates an aleatoric composition and writes it to disk while the excerpts are chosen.
+    Nothing proportional to the length of the composition is kept in memory (except the chosen indexes when the composition
+    has constraints), so it can be used for very long compositions.
+    The tracks are only read (Track.excerpts is not filled).
+
+    Parameters:
+        composition: The composition object containing metadata and track information.
+        tracks: A list of track objects, each containing excerpts and probabilities.
+        output_folder: The folder where the MIDI file will be saved.
+        block_size: The number of excerpts chosen at once for each track.
+
+    Returns:
+        seed: The seed used in the generation, also saved in the MIDI file.
+    """
+
+    seed = composition.generation_seed()
+    file_path = os.path.join(output_folder, f"{clean_file_name(composition.name)}.mid")
+    export_stream(file_path, composition, tracks, seed, block_size)
+    return seed
+
+
+def export_stream(file_path, composition, tracks, seed, block_size=4096, progress=None):
+
+    """
+    Writes a composition to a MIDI file track by track, pulling the excerpt choices from a generator
+    and writing each MTrk chunk incrementally (its length is patched at the end).
+    The file does not depend on the block size: it is the same file generate() writes with the same seed.
+
+    Parameters:
+        file_path: The path where the MIDI file will be saved.
+        composition: The composition object (name, bpm, length and number of tracks).
+        tracks: A list of track objects, each containing excerpts and probabilities.
+        seed: The seed of the generation, also saved in the MIDI file.
+        block_size: The number of excerpts chosen at once for each track.
+        progress: An optional callable progress(done, total), called every PROGRESS_INTERVAL excerpts and at the end
+            of each track, with the number of excerpts written and the total of all tracks.
+            It can raise GenerationCancelled to stop the generation.
+        If the generation is cancelled or fails, the partial file is removed.
+
+    Returns:
+        None
+    """
+
+    used_tracks = tracks[:composition.max_tracks]
+    rngs = composition.random_generators(seed)
+    total = composition.length * len(used_tracks)
+
+    # Constraints relate the bars of every track, so the excerpts of all the tracks are chosen before writing
+    # (only their indexes are kept in memory)
+    indexes = draw_tracks(used_tracks, composition.length, rngs, composition.constraints) if composition.constraints else None
+
+    folder = os.path.dirname(file_path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    with open(file_path, 'wb') as file:
+        try:
+            file.write(encode_header(len(used_tracks)))
+            for n, track in enumerate(used_tracks):
+                header = encode_track_header(composition, track, n == 0, seed)
+                if indexes is None:
+                    compiled_excerpts = iter_compiled_excerpts(track, composition.length, rngs[n], block_size)
+                else:
+                    compiled_excerpts = (compile_excerpt(track.input_excerpts.excerpts[i], track.note_shift) for i in indexes[n].tolist())
+                if progress is not None:
+                    compiled_excerpts = _report_progress(compiled_excerpts, progress, n * composition.length, total)
+                write_track_stream(file, header, compiled_excerpts)
+                if progress is not None:
+                    progress((n + 1) * composition.length, total)
+        except BaseException:
+            # Never leave a broken file behind (cancelled, or an error such as an invalid BPM after the header was written)
+            file.close()
+            os.remove(file_path)
+            raise
+
+
+def iter_compiled_excerpts(track, length, rng, block_size=4096):
+
+    """
+    Chooses the excerpts of a track in blocks and yields them compiled, one at a time.
+
+    Parameters:
+        track: The track object.
+        length: The number of excerpts to choose.
+        rng: The NumPy random generator of the track.
+        block_size: The number of excerpts chosen at once.
+
+    Yields:
+        The compiled excerpts (see compile_excerpt).
+    """
+
+    input_excerpts = track.input_excerpts.excerpts
+    previous = ()
+    for block_start in range(0, length, block_size):
+        chosen = track.draw_sequence(min(block_size, length - block_start), rng, previous).tolist()
+        for i in chosen:
+            yield compile_excerpt(input_excerpts[i], track.note_shift)
+        # A Markov chain continues from the last excerpts of the block
+        previous = chosen[-track.markov_chain.order:] if track.markov_chain is not None else ()
+
+
+def _report_progress(compiled_excerpts, progress, done, total):
+
+    """
+    Yields the compiled excerpts of a track, calling progress every PROGRESS_INTERVAL excerpts.
+    """
+
+    for i, compiled_excerpt in enumerate(compiled_excerpts, 1):
+        yield compiled_excerpt
+        if i % PROGRESS_INTERVAL == 0:
+            progress(done + i, total)
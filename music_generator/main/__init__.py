@@ -1,2 +1,12 @@
-from .simple_gui import simple_gui_test
 from .simple_no_gui import simple_no_gui_test
+from .batch_no_gui import batch_no_gui
+from .cli import run_cli, run_job_cli
+
+def __getattr__(name):
+    """
+    Imports the GUI entry point only when it is used, so the headless ones do not need tkinter.
+    """
+    if name == "simple_gui_test":
+        from .simple_gui import simple_gui_test
+        return simple_gui_test
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
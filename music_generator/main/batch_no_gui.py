@@ -0,0 +1,37 @@
+import time
+import os
+from music_generator import import_excerpts_parallel, Composition, Track, generate_batch, generate_parallel
+
+def batch_no_gui(count, workers=1):
+    '''Batch no GUI mode for the music generator application.
+    Generates several compositions from the excerpts in the input folder and reports the throughput.
+    With more than one worker the files are generated in parallel by a pool of processes.
+    '''
+
+    # Import the excerpts only once, they are shared by all the generated files
+    input_excerpts = import_excerpts_parallel("input")
+
+    # Initialize the composition and the tracks
+    composition = Composition()
+    names = ['Bassoon', 'French Horn', 'Clarinet', 'Flute', 'Cello', 'Violin']
+    tracks = []
+    for n in range(composition.max_tracks):
+        track = Track(f"Track {n+1}", input_excerpts)
+        track.set_name(names[n])
+        track.set_octave(n+1)
+        track.set_discrete_uniform_probabilities()
+        tracks.append(track)
+
+    # Generate the compositions
+    if workers > 1:
+        file_paths, report = generate_parallel(composition, tracks, count, os.path.join("output"), workers)
+        print(f"Generated {report['files']} files in {report['seconds']:.2f} s ({report['files_per_second']:.1f} files/s, seed {report['seed']})")
+        for pid, stats in sorted(report["workers"].items()):
+            print(f"  Worker {pid}: {stats['files']} files, {stats['files_per_second']:.1f} files/s")
+        return
+
+    start_time = time.perf_counter()
+    file_paths = generate_batch(composition, tracks, count, os.path.join("output"))
+    elapsed = time.perf_counter() - start_time
+
+    print(f"Generated {len(file_paths)} files in {elapsed:.2f} s ({len(file_paths) / elapsed:.1f} files/s)")
@@ -0,0 +1,158 @@
+import argparse
+import os
+import sys
+import time
+from music_generator import (
+    Composition,
+    PitchClassClash,
+    DensityCap,
+    PROBABILITY_PRESETS_TABLE,
+    generate,
+    generate_batch,
+    generate_parallel,
+    generate_stream,
+    run_job
+)
+from music_generator.files.job_file import build_track, load_corpus
+
+DEFAULT_TRACK = "Acoustic Grand Piano:4:Uniform"
+
+
+def run_cli(argv=None):
+    '''Headless command line interface for the music generator application.
+    Parses the arguments of the "generate" command, builds the composition and the tracks and generates the files.
+    Returns the exit code.
+    '''
+
+    parser = create_parser()
+    args = parser.parse_args(argv)
+
+    try:
+        composition, tracks = build_generation(args)
+    except ValueError as error:
+        parser.error(str(error))
+
+    start_time = time.perf_counter()
+    if args.stream:
+        seed = generate_stream(composition, tracks, args.output)
+        print(f"Generated 1 file (seed {seed})")
+    elif args.count == 1:
+        os.makedirs(args.output, exist_ok=True)
+        seed = generate(composition, tracks, args.output)
+        print(f"Generated 1 file (seed {seed})")
+    elif args.workers > 1:
+        file_paths, report = generate_parallel(composition, tracks, args.count, args.output, args.workers)
+        print(f"Generated {report['files']} files (seeds {report['seed']} to {report['seed'] + args.count - 1})")
+        for pid, stats in sorted(report["workers"].items()):
+            print(f"  Worker {pid}: {stats['files']} files, {stats['files_per_second']:.1f} files/s")
+    else:
+        seed = composition.generation_seed()
+        file_paths = generate_batch(composition, tracks, args.count, args.output, seed=seed)
+        print(f"Generated {len(file_paths)} files (seeds {seed} to {seed + args.count - 1})")
+    print(f"Done in {time.perf_counter() - start_time:.2f} s")
+    return 0
+
+
+def create_parser():
+    '''Creates the argument parser of the "generate" command.'''
+
+    parser = argparse.ArgumentParser(
+        prog="music_generator.py generate",
+        description="Generates aleatoric compositions without the GUI.",
+        epilog="Track format: INSTRUMENT[:OCTAVE[:PRESET]], e.g. --track \"Flute:5:Binomial, p=0.3\". "
+               f"Default track: \"{DEFAULT_TRACK}\". Presets: {' | '.join(PROBABILITY_PRESETS_TABLE)}."
+    )
+    parser.add_argument("--corpus", default="input", help="Folder with .mid excerpts or corpus file (default: input)")
+    parser.add_argument("--name", help="Name of the composition (default: timestamped name)")
+    parser.add_argument("--bpm", type=int, default=120, help="Tempo in beats per minute (default: 120)")
+    parser.add_argument("--length", type=int, default=16, help="Length in bars (default: 16)")
+    parser.add_argument("--track", action="append", dest="tracks", metavar="SPEC", help="Track specification, up to 6 (repeat the option)")
+    parser.add_argument("--seed", type=int, help="Seed of the first file (default: random)")
+    parser.add_argument("--count", type=int, default=1, help="Number of files to generate (default: 1)")
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes (default: 1)")
+    parser.add_argument("--output", default="output", help="Output folder (default: output)")
+    parser.add_argument("--no-clash", nargs="?", const="1", metavar="INTERVALS", help="Avoid clashing pitch classes between tracks in the same bar (semitones, comma separated; default: 1)")
+    parser.add_argument("--max-notes", type=int, help="Maximum number of notes of all the tracks in a bar")
+    parser.add_argument("--stream", action="store_true", help="Write a single file while generating it, with constant memory (for very long compositions)")
+    return parser
+
+
+def build_generation(args):
+    '''Builds the composition and the tracks described by the parsed arguments. Raises ValueError if they are not valid.'''
+
+    track_specs = args.tracks or [DEFAULT_TRACK]
+    composition = Composition()
+    if len(track_specs) > composition.max_tracks:
+        raise ValueError(f"At most {composition.max_tracks} tracks are allowed")
+    if args.length < 1 or args.count < 1 or args.workers < 1 or args.bpm < 1:
+        raise ValueError("bpm, length, count and workers must be positive")
+    if args.stream and args.count != 1:
+        raise ValueError("--stream generates a single file")
+
+    if args.name:
+        composition.set_name(args.name)
+    composition.set_bpm(args.bpm)
+    composition.set_length(args.length)
+    composition.set_max_tracks(len(track_specs))
+    # Choose the seed now, since the random presets of the tracks depend on it
+    composition.set_seed(args.seed if args.seed is not None else composition.generation_seed())
+
+    constraints = []
+    if args.no_clash:
+        try:
+            constraints.append(PitchClassClash(tuple(int(interval) for interval in args.no_clash.split(","))))
+        except ValueError:
+            raise ValueError(f"Invalid intervals: {args.no_clash}")
+    if args.max_notes is not None:
+        constraints.append(DensityCap(args.max_notes))
+    composition.set_constraints(constraints)
+
+    input_excerpts = load_corpus(args.corpus)
+    tracks = [parse_track(spec, input_excerpts, n, composition.seed) for n, spec in enumerate(track_specs)]
+    return composition, tracks
+
+
+def parse_track(spec, input_excerpts, n, seed=None):
+    '''Builds a track from a specification INSTRUMENT[:OCTAVE[:PRESET]]. Random presets are drawn from the seed.'''
+
+    parts = spec.split(":", 2)
+    instrument = parts[0].strip()
+    octave = parts[1].strip() if len(parts) > 1 and parts[1].strip() else "4"
+    preset = parts[2].strip() if len(parts) > 2 and parts[2].strip() else "Uniform"
+    if not octave.isdigit():
+        raise ValueError(f"Octave must be between 0 and 7: {octave}")
+    return build_track(input_excerpts, n, instrument, int(octave), preset, seed=seed)
+
+
+def run_job_cli(argv=None):
+    '''Runs a job file (see load_job) from the command line, resuming it from its checkpoint if there is one.
+    Returns the exit code.
+    '''
+
+    parser = argparse.ArgumentParser(
+        prog="music_generator.py job",
+        description="Generates every composition described by a job file (.json or .toml), resuming interrupted runs."
+    )
+    parser.add_argument("job", help="Path of the job file")
+    parser.add_argument("--workers", type=int, help="Number of worker processes (default: value of the job or number of CPU cores)")
+    parser.add_argument("--checkpoint", help="Path of the checkpoint file (default: job path with the extension .checkpoint.json)")
+    args = parser.parse_args(argv)
+
+    def progress(done, total):
+        print(f"\r{done}/{total} files", end="", flush=True)
+
+    try:
+        report = run_job(args.job, args.workers, args.checkpoint, progress)
+    except (ValueError, OSError) as error:
+        parser.error(str(error))
+    print()
+    if report["skipped"]:
+        print(f"Resumed: {report['skipped']} files were already generated")
+    for name, seed in report["seeds"].items():
+        print(f"  {name}: seed {seed}")
+    print(f"Generated {report['files']} files in {report['seconds']:.2f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_cli())
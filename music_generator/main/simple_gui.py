@@ -1,4 +1,4 @@
-from music_generator import Composition, Track, import_excerpts, create_window
+from music_generator import Composition, Track, import_excerpts_parallel, create_window
 import tkinter as tk
 import ttkbootstrap as ttk
 import os
@@ -16,7 +16,7 @@ def simple_gui_test():
             os.makedirs(folder, exist_ok=True)
 
     # Import excerpts from the input folder
-    input_excerpts=import_excerpts(os.path.join("input"))
+    input_excerpts=import_excerpts_parallel(os.path.join("input"))
 
 
     tracks = [Track(f"Track {i+1}", input_excerpts) for i in range(composition.max_tracks)]
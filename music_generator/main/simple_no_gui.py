@@ -1,4 +1,3 @@
-import random
 import os
 from music_generator import import_excerpts, Composition, Track, export_file
 
@@ -11,21 +10,28 @@ def simple_no_gui_test():
     number_tracks = int(input("Enter the number of tracks to include in the excerpt: "))
 
     #Initialize the composition
-    composition = Composition("Generated_Excerpt")
-    composition.set_bpm(80) 
+    composition = Composition()
+    composition.set_name("Generated_Excerpt")
+    composition.set_bpm(80)
+    composition.set_max_tracks(number_tracks)
+
+    # Each track draws from its own random stream, derived from the seed
+    seed = composition.generation_seed()
+    rngs = composition.random_generators(seed)
 
     # Create test tracks and add excerpts
     for n in range(number_tracks):
         name = ['Bassoon', 'French Horn', 'Clarinet','Flute']
-        track = Track(input_excerpts=input_excerpts.excerpts)
+        track = Track(input_excerpts=input_excerpts)
         track.set_discrete_uniform_probabilities()
         print(track.probabilities)
-        for chosen_excerpt in random.choices(input_excerpts.excerpts, weights=track.probabilities, k=length): 
-            track.add_excerpt(chosen_excerpt)        
+        for i in track.draw_sequence(length, rngs[n]).tolist():
+            track.add_excerpt(input_excerpts.excerpts[i])
         track.set_octave(n+2)
         track.set_name(name[n])
         composition.add_track(track)
-    
+
     # Export the composition to a MIDI file
     file_path = os.path.join("output", f"{composition.name}.mid")
-    export_file(file_path, composition)
\ No newline at end of file
+    export_file(file_path, composition, seed)
+    print(f"Seed: {seed}")
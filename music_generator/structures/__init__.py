@@ -1,7 +1,27 @@
 from .excerpt import Excerpt
 from .excerpt_collection import ExcerptCollection
+from .excerpt_features import ExcerptFeatures
 from .composition import Composition
 from .track import Track
 from .note_message import NoteMessage
 from .midi_instrument_table import MIDI_INSTRUMENT_TABLE
-from .probability_presets import PROBABILITY_PRESETS_TABLE
+from .instrument_index import (
+    instrument_program,
+    instrument_name,
+    category_programs,
+    find_instruments,
+    resolve_instrument
+)
+from .probability_presets import PROBABILITY_PRESETS_TABLE, SEEDED_PRESETS
+from .alias_sampler import AliasSampler
+from .markov_chain import MarkovChain
+from .constraints import (
+    PitchClassClash,
+    DensityCap,
+    draw_tracks
+)
+from .distributions import (
+    Distribution,
+    distribution,
+    register_distribution
+)
@@ -0,0 +1,68 @@
+import random
+import numpy as np
+
+class AliasSampler:
+    '''
+    Samples indexes from a discrete probability distribution in O(1) per draw, using Walker's alias method (Vose's construction).
+    The table is built once in O(n) and can then be used for any number of draws.
+    Attributes:
+        size (int): Number of possible outcomes.
+        probabilities (ndarray): Probability of keeping each column instead of jumping to its alias.
+        aliases (ndarray): Alias of each column.
+    Methods:
+        draw(rng): Draws a single index using a random.Random generator.
+        draw_k(k, rng): Draws k indexes at once using a NumPy generator.
+    '''
+
+    def __init__(self, weights):
+        '''
+        Builds the alias table from a list of non-negative weights (they do not need to sum to 1).
+        '''
+        weights = np.asarray(weights, dtype=np.float64)
+        total = weights.sum() if weights.size else 0.0
+        if weights.ndim != 1 or total <= 0 or np.any(weights < 0) or not np.isfinite(total):
+            raise ValueError("Weights must be non-negative, finite and have a positive sum")
+
+        self.size = len(weights)
+        scaled = weights * (self.size / total)
+        probabilities = np.ones(self.size, dtype=np.float64)
+        aliases = np.arange(self.size, dtype=np.int64)
+
+        # Pair each column below the average with one above it
+        small = [i for i in range(self.size) if scaled[i] < 1.0]
+        large = [i for i in range(self.size) if scaled[i] >= 1.0]
+        scaled = scaled.tolist()
+        while small and large:
+            less = small.pop()
+            more = large[-1]
+            probabilities[less] = scaled[less]
+            aliases[less] = more
+            scaled[more] = scaled[more] + scaled[less] - 1.0
+            if scaled[more] < 1.0:
+                small.append(large.pop())
+
+        self.probabilities = probabilities
+        self.aliases = aliases
+        self._probability_list = probabilities.tolist()
+        self._alias_list = aliases.tolist()
+
+    def draw(self, rng=random):
+        '''
+        Draws a single index using a random.Random generator (or the random module).
+        '''
+        i = int(rng.random() * self.size)
+        return i if rng.random() < self._probability_list[i] else self._alias_list[i]
+
+    def draw_k(self, k, rng=None):
+        '''
+        Draws k indexes at once using a NumPy generator. Returns an array of indexes.
+        Each draw uses two consecutive uniforms of the generator (the column and the test to keep it), as MarkovChain.draw does,
+        so drawing k1 and then k2 indexes gives the same indexes as drawing k1 + k2 at once (streamed files do not depend on
+        their block size).
+        '''
+        if rng is None:
+            rng = np.random.default_rng()
+        uniforms = rng.random((k, 2))
+        columns = np.minimum((uniforms[:, 0] * self.size).astype(np.int64), self.size - 1)
+        keep = uniforms[:, 1] < self.probabilities[columns]
+        return np.where(keep, columns, self.aliases[columns])
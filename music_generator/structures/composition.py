@@ -1,4 +1,6 @@
 import datetime
+import random
+import numpy as np
 
 class Composition:
     """
@@ -9,12 +11,18 @@ class Composition:
         length (int): The length of the composition in bars. Default is 16.
         max_tracks (int): The maximum number of tracks allowed in the composition. Default is 6 and should not be changed.
         tracks (list): A list to store the tracks added to the composition.
+        seed (int): The seed of the generation. If None, a new random seed is chosen for every generation.
+        constraints (list): Constraints between the simultaneous bars of the tracks (see the constraints module). Empty by default.
     Methods:
         add_track(track): Adds a track to the composition.
         set_bpm(bpm): Sets the BPM (tempo) of the composition.
         set_name(name): Sets the name of the composition.
         set_max_tracks(max_tracks): Sets the maximum number of tracks.
         set_length(length): Sets the length of the composition.
+        set_seed(seed): Sets the seed of the generation.
+        set_constraints(constraints): Sets the constraints between the tracks.
+        generation_seed(): Returns the seed to be used in the next generation.
+        random_generators(seed): Returns an independent random generator for each track, derived from the seed.
     """
     
 
@@ -28,6 +36,8 @@ class Composition:
         self.length = 16
         self.max_tracks = 6
         self.tracks = []
+        self.seed = None
+        self.constraints = []
 
     def add_track(self, track):
         '''
@@ -57,4 +67,31 @@ class Composition:
         '''
         Sets the length of the composition.
         '''
-        self.length = length
\ No newline at end of file
+        self.length = length
+
+    def set_seed(self, seed):
+        '''
+        Sets the seed of the generation. Use None to choose a new random seed for every generation.
+        '''
+        self.seed = seed
+
+    def set_constraints(self, constraints):
+        '''
+        Sets the constraints between the simultaneous bars of the tracks, e.g. [PitchClassClash(), DensityCap(24)].
+        '''
+        self.constraints = list(constraints)
+
+    def generation_seed(self):
+        '''
+        Returns the seed to be used in the next generation: the seed of the composition, or a new random one if it is None.
+        '''
+        if self.seed is None:
+            return random.randrange(2**63)
+        return self.seed
+
+    def random_generators(self, seed):
+        '''
+        Returns one independent NumPy random generator per track (max_tracks), all derived from the seed.
+        The same seed always gives the same generators, so a generation can be repeated bit-for-bit.
+        '''
+        return [np.random.default_rng(child) for child in np.random.SeedSequence(seed).spawn(self.max_tracks)]
@@ -0,0 +1,161 @@
+import numpy as np
+
+# Bits of a pitch class mask (one per pitch class)
+PITCH_CLASS_BITS = 0xFFF
+
+
+class PitchClassClash:
+    '''
+    Constraint that forbids simultaneous bars of different tracks from playing pitch classes at a clashing interval.
+    By default the clashing interval is the semitone, so a minor second (or major seventh, or minor ninth) between
+    two tracks is a clash; add 6 to the intervals to also forbid tritones.
+    Attributes:
+        intervals (tuple): Intervals in semitones (1 to 11) that clash. An interval and its inversion are equivalent.
+    Methods:
+        clash_masks(masks): Returns the pitch classes that clash with each mask.
+        violations(masks, counts): Returns the number of clashing track pairs in each bar.
+        column_violations(masks, counts, n, column_masks, column_counts): Returns the clashing pairs of the track n with other excerpts.
+    '''
+
+    def __init__(self, intervals=(1,)):
+        '''
+        Initializes a new PitchClassClash instance.
+        '''
+        if any(not 1 <= interval <= 11 for interval in intervals):
+            raise ValueError(f"Intervals must be between 1 and 11 semitones: {intervals}")
+        self.intervals = tuple(intervals)
+        self._clash_table = self.clash_masks(np.arange(PITCH_CLASS_BITS + 1, dtype=np.uint16))
+
+    def clash_masks(self, masks):
+        '''
+        Returns, for each pitch class mask, the mask of the pitch classes that clash with it (above or below it).
+        '''
+        clashes = np.zeros(len(masks), dtype=np.uint16)
+        for interval in self.intervals:
+            clashes |= rotate_pitch_classes(masks, interval) | rotate_pitch_classes(masks, -interval)
+        return clashes
+
+    def violations(self, masks, counts):
+        '''
+        Returns the number of track pairs with clashing pitch classes in each bar, given the pitch class masks
+        of the chosen excerpts as an array of shape (bars, tracks).
+        '''
+        clashes = self._clash_table[masks]
+        score = np.zeros(masks.shape[0], dtype=np.int64)
+        for a in range(masks.shape[1]):
+            for b in range(a + 1, masks.shape[1]):
+                score += (clashes[:, a] & masks[:, b]) != 0
+        return score
+
+    def column_violations(self, masks, counts, n, column_masks, column_counts):
+        '''
+        Returns the number of tracks that would clash with the track n in each bar if it played other excerpts, given by their
+        pitch class masks as an array of shape (bars, candidates). Only the pairs with the track n change with its excerpt.
+        '''
+        clashing = (self._clash_table[column_masks][:, :, None] & masks[:, None, :]) != 0
+        clashing[:, :, n] = False
+        return clashing.sum(axis=2)
+
+
+class DensityCap:
+    '''
+    Constraint that limits the total number of notes played by all the tracks in each bar.
+    Attributes:
+        max_notes (int): Maximum number of notes per bar.
+    Methods:
+        violations(masks, counts): Returns the number of notes above the maximum in each bar.
+        column_violations(masks, counts, n, column_masks, column_counts): Returns the notes above the maximum with other excerpts in the track n.
+    '''
+
+    def __init__(self, max_notes):
+        '''
+        Initializes a new DensityCap instance.
+        '''
+        self.max_notes = max_notes
+
+    def violations(self, masks, counts):
+        '''
+        Returns the number of notes above the maximum in each bar, given the note counts of the chosen excerpts
+        as an array of shape (bars, tracks).
+        '''
+        return np.maximum(counts.sum(axis=1) - self.max_notes, 0)
+
+    def column_violations(self, masks, counts, n, column_masks, column_counts):
+        '''
+        Returns the number of notes above the maximum in each bar if the track n played other excerpts, given by their
+        note counts as an array of shape (bars, candidates).
+        '''
+        others = counts.sum(axis=1, keepdims=True) - counts[:, n:n + 1]
+        return np.maximum(others + column_counts - self.max_notes, 0)
+
+
+def rotate_pitch_classes(masks, shift):
+    '''
+    Transposes pitch class masks by a number of semitones (a rotation of their 12 bits).
+    '''
+    shift %= 12
+    masks = masks.astype(np.uint16)
+    return ((masks << shift) | (masks >> (12 - shift))) & PITCH_CLASS_BITS
+
+
+def draw_tracks(tracks, length, rngs, constraints=(), max_attempts=32, candidates=4):
+    '''
+    Chooses the excerpt indexes of every track. Without constraints each track is drawn on its own (Track.draw_sequence).
+    With constraints, the bars that violate them are redrawn, all at once, one track per pass (in turns): candidates excerpts
+    are drawn for each bar, and the best one is kept if the bar has no more violations with it than before. Only the part
+    of the violations that depends on the redrawn track is scored. It stops after max_attempts passes, or after a full round
+    over the tracks improves no bar, so a bar that cannot be fixed keeps its least violating excerpts.
+    Tracks with a Markov chain are never redrawn (their bars depend on each other), the other tracks adapt to them.
+    A constraint has the methods violations(masks, counts) and column_violations(masks, counts, n, column_masks, column_counts).
+    Returns a list with an array of indexes per track.
+    '''
+    indexes = [track.draw_sequence(length, rngs[n]) for n, track in enumerate(tracks)]
+    if not constraints or not tracks:
+        return indexes
+
+    features = [track.input_excerpts.features() for track in tracks]
+
+    def column(n, chosen):
+        # Pitch classes (transposed to the octave of the track) and note counts of the chosen excerpts of the track n
+        return rotate_pitch_classes(features[n].pitch_class_masks[chosen], tracks[n].note_shift), features[n].note_counts[chosen]
+
+    def column_score(bad_masks, bad_counts, n, column_masks, column_counts):
+        return sum(constraint.column_violations(bad_masks, bad_counts, n, column_masks, column_counts) for constraint in constraints)
+
+    chosen = np.stack(indexes, axis=1)
+    columns = [column(n, indexes[n]) for n in range(len(tracks))]
+    masks = np.stack([column_masks for column_masks, _ in columns], axis=1)
+    counts = np.stack([column_counts for _, column_counts in columns], axis=1)
+    scores = sum(constraint.violations(masks, counts) for constraint in constraints)
+    bad = np.flatnonzero(scores > 0)
+    free = [n for n, track in enumerate(tracks) if track.markov_chain is None]
+    last_improvement = 0
+    for attempt in range(max_attempts):
+        if not bad.size or not free or attempt - last_improvement >= len(free):
+            break
+        n = free[attempt % len(free)]
+        bad_masks, bad_counts = masks[bad], counts[bad]
+        # Few bad bars cost the same per pass as many, so they get more candidates and need fewer passes
+        width = max(candidates, min(64, 1024 // bad.size))
+        options = tracks[n].sampler.draw_k(bad.size * width, rngs[n]).reshape(bad.size, width)
+        option_masks, option_counts = column(n, options)
+        # The current excerpt is scored with the candidates, in column 0
+        option_scores = column_score(bad_masks, bad_counts, n, np.concatenate((bad_masks[:, n:n + 1], option_masks), axis=1),
+                                     np.concatenate((bad_counts[:, n:n + 1], option_counts), axis=1))
+        current = option_scores[:, 0]
+        option_scores = option_scores[:, 1:]
+
+        # Keep the best candidate of each bar unless it is worse than the current excerpt
+        best = option_scores.argmin(axis=1)
+        rows = np.arange(bad.size)
+        best_scores = option_scores[rows, best]
+        accept = best_scores <= current
+        if np.any(best_scores < current):
+            last_improvement = attempt + 1
+        rows, best = rows[accept], best[accept]
+        chosen[bad[rows], n] = options[rows, best]
+        masks[bad[rows], n] = option_masks[rows, best]
+        counts[bad[rows], n] = option_counts[rows, best]
+        scores[bad[rows]] += best_scores[rows] - current[rows]
+        bad = bad[scores[bad] > 0]
+    return [chosen[:, n] for n in range(len(tracks))]
@@ -0,0 +1,128 @@
+import functools
+import numpy as np
+from music_generator.structures.alias_sampler import AliasSampler
+
+# Log weight functions of the distributions, by name. Each one receives the indexes k = 0, ..., n-1 of the excerpts
+# and the parameters of the distribution, and returns the logarithm of the (unnormalized) weight of each index.
+DISTRIBUTIONS = {}
+
+
+class Distribution:
+    '''
+    Probabilities of the excerpts of a collection given by a distribution, with the alias sampler built from them.
+    Instances are cached (see distribution), so they must not be modified.
+    Attributes:
+        name (str): Name of the distribution.
+        params (dict): Parameters of the distribution.
+        probabilities (ndarray): Probability of each index (read-only), summing to 1.
+        sampler (AliasSampler): Alias table built from the probabilities.
+    '''
+
+    def __init__(self, name, params, log_weights):
+        '''
+        Initializes a new Distribution instance, normalizing the log weights in log space.
+        '''
+        log_weights = np.asarray(log_weights, dtype=np.float64)
+        if log_weights.size == 0 or not np.any(np.isfinite(log_weights)) or np.any(np.isnan(log_weights)) or np.any(log_weights == np.inf):
+            raise ValueError(f"The distribution {name} has no finite weights")
+        # Subtract the largest log weight before exponentiating (as in log-sum-exp), so the largest weight is 1 and nothing overflows
+        shifted = np.exp(log_weights - np.max(log_weights))
+        probabilities = shifted / shifted.sum()
+        probabilities.flags.writeable = False
+        self.name = name
+        self.params = params
+        self.probabilities = probabilities
+        self.sampler = AliasSampler(probabilities)
+
+
+def register_distribution(name, log_weights):
+    '''
+    Registers a distribution. log_weights(k, **params) receives the indexes k (a NumPy array 0, ..., n-1) and returns
+    the logarithm of the weight of each index; they are normalized afterwards, so they do not need to sum to 1.
+    A weight of 0 is a log weight of -inf.
+    '''
+    DISTRIBUTIONS[name] = log_weights
+    _cached_distribution.cache_clear()
+
+
+def distribution(name, n, **params):
+    '''
+    Returns the Distribution of n excerpts with a name and parameters, e.g. distribution("binomial", 100, p=0.3).
+    The result is cached per (name, parameters, n), so applying the same preset again costs a dictionary lookup.
+    The Dirichlet distribution without a seed draws new probabilities each time and is not cached.
+    '''
+    if name not in DISTRIBUTIONS:
+        raise ValueError(f"Unknown distribution: {name}")
+    if n < 1:
+        raise ValueError("A distribution needs at least one excerpt")
+    if name == "dirichlet" and params.get("seed") is None:
+        return _build_distribution(name, n, params)
+    return _cached_distribution(name, n, tuple(sorted(params.items())))
+
+
+@functools.lru_cache(maxsize=256)
+def _cached_distribution(name, n, params):
+    return _build_distribution(name, n, dict(params))
+
+
+def _build_distribution(name, n, params):
+    k = np.arange(n, dtype=np.float64)
+    with np.errstate(divide='ignore'):
+        return Distribution(name, params, DISTRIBUTIONS[name](k, **params))
+
+
+def _check_probability(p):
+    if not 0 <= p <= 1:
+        raise ValueError(f"p must be between 0 and 1: {p}")
+
+
+def _uniform(k):
+    return np.zeros(len(k))
+
+
+def _point(k, index=0):
+    log_weights = np.full(len(k), -np.inf)
+    log_weights[min(index, len(k) - 1)] = 0.0
+    return log_weights
+
+
+def _binomial(k, p):
+    # Binomial(n-1, p) over the indexes, with the log of the binomial coefficients instead of the (possibly huge) coefficients.
+    # SciPy is only imported when a binomial distribution is first needed, because importing it is slow
+    from scipy.special import gammaln, xlogy, xlog1py
+    _check_probability(p)
+    n = len(k) - 1
+    return gammaln(n + 1) - gammaln(k + 1) - gammaln(n - k + 1) + xlogy(k, p) + xlog1py(n - k, -p)
+
+
+def _geometric(k, p):
+    # Geometric distribution starting at index 0, truncated to the number of excerpts
+    _check_probability(p)
+    if p == 0:
+        return np.zeros(len(k))
+    if p == 1:
+        return _point(k)
+    return k * np.log1p(-p) + np.log(p)
+
+
+def _zipf(k, s=1.0):
+    # Weight of the index k proportional to 1 / (k+1)^s
+    return -s * np.log1p(k)
+
+
+def _dirichlet(k, alpha=1.0, seed=None):
+    # Probabilities drawn from a symmetric Dirichlet distribution (alpha=1 gives a uniformly random distribution)
+    if alpha <= 0:
+        raise ValueError(f"alpha must be positive: {alpha}")
+    rng = np.random.default_rng(seed)
+    # Draw the Gamma variables in log space, so small alphas do not underflow to 0
+    log_gamma = np.log(rng.gamma(alpha + 1, size=len(k))) + np.log(rng.random(len(k))) / alpha
+    return log_gamma
+
+
+register_distribution("uniform", _uniform)
+register_distribution("point", _point)
+register_distribution("binomial", _binomial)
+register_distribution("geometric", _geometric)
+register_distribution("zipf", _zipf)
+register_distribution("dirichlet", _dirichlet)
@@ -1,16 +1,26 @@
-import math
-from mido import Message
-from music_generator.structures.note_message import NoteMessage
+import numpy as np
+from array import array
+from music_generator.structures.note_message import NoteMessage, MESSAGE_TYPES, MESSAGE_TYPE_CODES, NOTE_ON
 
 class Excerpt:
 
     """
     Represents an excerpt. It is a collection of messages that can be used to create a musical piece.
+    The messages are stored packed in parallel arrays (one column per field), instead of one object per message.
     Attributes:
         name (str): Name of the excerpt.
-        messages (note_message): Collection of messsages.
+        types (array): Type of each message, encoded as a small integer (see MESSAGE_TYPES).
+        channels (array): MIDI channel of each message.
+        notes (array): MIDI note of each message.
+        velocities (array): Velocity of each message.
+        times (array): Delta time in ticks of each message.
+        messages (list): The messages as NoteMessage objects, built on demand (read-only view).
+        compiled (dict): Cache of the messages encoded as MIDI bytes, one entry per octave/channel variant. Cleared whenever the messages change.
     Methods:
         add_message(message): Adds a message to the excerpt.
+        add_note(type_code, channel, note, velocity, time): Adds a message to the excerpt from its packed values.
+        iter_messages(): Iterates over the packed values of each message.
+        transposed_notes(shift): Returns the notes shifted by a number of semitones and clamped to 0-127, without changing the excerpt.
         normalize(): Normalizes the notes so that the lowest note in the excerpt corresponds to the same note in the -1 octave.
         pad_length(): Pads the excerpt to ensure it has a length of 1 bar (480 ticks per beat; 4/4 time signature).
     """
@@ -20,31 +30,70 @@ class Excerpt:
         Initializes a new Excerpt instance.
         '''
         self.name = name
-        self.messages = []
+        self.types = array('B')
+        self.channels = array('B')
+        self.notes = array('B')
+        self.velocities = array('B')
+        self.times = array('I')
+        self.compiled = {}
+
+    def __len__(self):
+        '''
+        Returns the number of messages in the excerpt.
+        '''
+        return len(self.types)
+
+    @property
+    def messages(self):
+        '''
+        Returns the messages of the excerpt as NoteMessage objects. Changing them does not change the excerpt.
+        '''
+        return [NoteMessage.from_values(MESSAGE_TYPES[type_code], channel, note, velocity, time) for type_code, channel, note, velocity, time in self.iter_messages()]
 
     def add_message(self, message):
         '''
-        Adds a message to the excerpt.
+        Adds a message (NoteMessage or mido note message) to the excerpt.
         '''
-        self.messages.append(message)   
+        self.add_note(MESSAGE_TYPE_CODES[message.type], message.channel, message.note, message.velocity, message.time)
+
+    def add_note(self, type_code, channel, note, velocity, time):
+        '''
+        Adds a message to the excerpt from its packed values.
+        '''
+        self.types.append(type_code)
+        self.channels.append(channel)
+        self.notes.append(note)
+        self.velocities.append(velocity)
+        self.times.append(time)
+        self.compiled.clear()
+
+    def iter_messages(self):
+        '''
+        Iterates over the messages as (type_code, channel, note, velocity, time) tuples.
+        '''
+        return zip(self.types, self.channels, self.notes, self.velocities, self.times)
 
     def normalize(self):
         '''
         Normalizes the notes in the excerpt so that the lowest note corresponds to the same note in the -1 octave. This is done by subtracting the offset from each note in the excerpt.
         '''
-        if self.messages:
-            LowestNote = min(self.messages, key=lambda x: x.note)
-            offset = 12 * math.floor(LowestNote.note / 12)
-            for msg in self.messages:
-                msg.note = msg.note - offset
+        if self.notes:
+            notes = np.frombuffer(self.notes, dtype=np.uint8)
+            offset = 12 * (int(notes.min()) // 12)
+            self.notes = array('B', (notes - offset).tobytes())
+            self.compiled.clear()
+
+    def transposed_notes(self, shift):
+        '''
+        Returns the notes shifted by a number of semitones and clamped to 0-127 in a single vectorized pass. The excerpt is not changed.
+        '''
+        notes = np.frombuffer(self.notes, dtype=np.uint8).astype(np.int16)
+        return np.clip(notes + shift, 0, 127).astype(np.uint8)
 
     def pad_length(self):
         '''
         Pads the excerpt to ensure it has a length of 1 bar (480 ticks per beat; 4/4 time signature).
         '''
-        time = 0
-        for msg in self.messages:
-            time += msg.time
+        time = sum(self.times)
         if time < 480*4:
-            silence_message = Message(type='note_on', channel=0, note=0, velocity=0, time=480*4 - time)
-            self.add_message(NoteMessage(silence_message))
\ No newline at end of file
+            self.add_note(NOTE_ON, 0, 0, 0, 480*4 - time)
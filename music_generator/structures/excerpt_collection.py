@@ -1,6 +1,7 @@
-from mido import Message
+import numpy as np
 from music_generator.structures.excerpt import Excerpt
-from music_generator.structures.note_message import NoteMessage
+from music_generator.structures.note_message import NOTE_ON
+from music_generator.structures.excerpt_features import ExcerptFeatures
 
 class ExcerptCollection:
     
@@ -12,6 +13,12 @@ class ExcerptCollection:
     Methods:
         add_excerpt(excerpt): Adds a track to the excerpt.
         add_silence_excerpt(): Adds an excerpt with all silence to the collection.
+        lowest_note(): Returns the lowest note of all the excerpts in the collection.
+        features(): Returns the index of features of the excerpts (note range, note count, onsets, duration, pitch classes).
+        select(**query): Returns which excerpts match a query of their features.
+        pitch_class_masks(): Returns the pitch classes played in each excerpt, as 12-bit masks.
+        note_counts(): Returns the number of notes played in each excerpt.
+        message_columns(): Returns the number of messages of each excerpt and its columns, concatenated.
     """
         
     def __init__(self, name):
@@ -20,19 +27,72 @@ class ExcerptCollection:
         '''
         self.name = name
         self.excerpts = []
+        self._lowest_note = None
+        self._features = None
 
     def add_excerpt(self, excerpt):
         '''
         Adds an excerpt to the Excerpt Collection.
         '''
         self.excerpts.append(excerpt)
+        self._lowest_note = None
+        self._features = None
 
     def add_silence_excerpt(self):
         '''
         Adds an excerpt with all silence to the Excerpt Collection.
         '''
-        silence = Message(type='note_on', channel=0, note=0, velocity=0, time=480*4)
-        silence_message = NoteMessage(silence)
         silence_excerpt = Excerpt("Silêncio")
-        silence_excerpt.add_message(silence_message)
+        silence_excerpt.add_note(NOTE_ON, 0, 0, 0, 480*4)
         self.add_excerpt(silence_excerpt)
+
+    def lowest_note(self):
+        '''
+        Returns the lowest note of all the excerpts in the collection, or None if there are no messages.
+        The result is cached until an excerpt is added, so changing the octave of a track does not scan the excerpts again.
+        '''
+        if self._lowest_note is None:
+            notes = [excerpt.notes for excerpt in self.excerpts if excerpt.notes]
+            if not notes:
+                return None
+            self._lowest_note = int(np.frombuffer(b''.join(notes), dtype=np.uint8).min())
+        return self._lowest_note
+
+    def features(self):
+        '''
+        Returns the index of features of the excerpts (ExcerptFeatures), computed for all the excerpts at once from their message
+        columns and cached until an excerpt is added. The importers build it right away, so queries only read arrays.
+        '''
+        if self._features is None:
+            self._features = ExcerptFeatures.from_columns(*self.message_columns())
+        return self._features
+
+    def select(self, **query):
+        '''
+        Returns a boolean array with the excerpts that match a query of their features (see ExcerptFeatures.select),
+        e.g. select(max_notes=8, min_syncopation=0.5).
+        '''
+        return self.features().select(**query)
+
+    def pitch_class_masks(self):
+        '''
+        Returns an array with the pitch classes played in each excerpt, as 12-bit masks (bit p set if a note with pitch class p,
+        C = 0, is played).
+        '''
+        return self.features().pitch_class_masks
+
+    def note_counts(self):
+        '''
+        Returns an array with the number of notes played (note_on messages with a velocity) in each excerpt.
+        '''
+        return self.features().note_counts
+
+    def message_columns(self):
+        '''
+        Returns the number of messages of each excerpt and the types, notes, velocities and times of all the messages,
+        concatenated in excerpt order, as NumPy arrays.
+        '''
+        counts = np.array([len(excerpt) for excerpt in self.excerpts], dtype=np.int64)
+        columns = [np.frombuffer(b''.join(getattr(excerpt, column).tobytes() for excerpt in self.excerpts), dtype=dtype)
+                   for column, dtype in (('types', np.uint8), ('notes', np.uint8), ('velocities', np.uint8), ('times', np.uint32))]
+        return (counts, *columns)
@@ -0,0 +1,112 @@
+import numpy as np
+from music_generator.structures.note_message import NOTE_ON
+
+# Ticks of a bar (480 ticks per beat; 4/4 time signature) and number of onset positions per bar (sixteenth notes)
+BAR_TICKS = 480 * 4
+ONSET_SLOTS = 16
+
+
+class ExcerptFeatures:
+    '''
+    Index of features of every excerpt of a collection, stored as one NumPy array per feature, so queries over all
+    the excerpts are vectorized. Only the notes played (note_on messages with a velocity) are counted.
+    Attributes:
+        note_counts (ndarray): Number of notes played in each excerpt.
+        lowest_notes (ndarray): Lowest note played in each excerpt (-1 if it has no notes).
+        highest_notes (ndarray): Highest note played in each excerpt (-1 if it has no notes).
+        pitch_class_masks (ndarray): Pitch classes played in each excerpt, as 12-bit masks (bit p for the pitch class p, C = 0).
+        durations (ndarray): Length of each excerpt in ticks.
+        onset_histograms (ndarray): Number of notes starting at each sixteenth note of the bar, shape (excerpts, 16).
+        syncopation (ndarray): Fraction of the notes of each excerpt that start off the beat (0 if it has no notes).
+    Methods:
+        from_columns(counts, types, notes, velocities, times): Computes the features from the message columns of a collection.
+        select(**query): Returns which excerpts match a query.
+    '''
+
+    def __init__(self, note_counts, lowest_notes, highest_notes, pitch_class_masks, durations, onset_histograms):
+        '''
+        Initializes a new ExcerptFeatures instance.
+        '''
+        self.note_counts = note_counts
+        self.lowest_notes = lowest_notes
+        self.highest_notes = highest_notes
+        self.pitch_class_masks = pitch_class_masks
+        self.durations = durations
+        self.onset_histograms = onset_histograms
+        on_beat = onset_histograms[:, ::ONSET_SLOTS // 4].sum(axis=1)
+        self.syncopation = np.divide(note_counts - on_beat, note_counts, out=np.zeros(len(note_counts)), where=note_counts > 0)
+
+    def __len__(self):
+        '''
+        Returns the number of excerpts.
+        '''
+        return len(self.note_counts)
+
+    @classmethod
+    def from_columns(cls, counts, types, notes, velocities, times):
+        '''
+        Computes the features from the number of messages of each excerpt and the columns of all the messages, concatenated
+        in excerpt order (see ExcerptCollection.message_columns), in a few passes over the whole collection.
+        '''
+        size = len(counts)
+        owners = np.repeat(np.arange(size), counts)
+        # Time of each message from the start of its excerpt
+        ends = np.cumsum(times, dtype=np.int64)
+        durations = np.bincount(owners, weights=times, minlength=size).astype(np.int64)
+        onsets = ends - np.repeat(np.cumsum(durations) - durations, counts)
+
+        played = (types == NOTE_ON) & (velocities > 0)
+        owners = owners[played]
+        played_notes = notes[played].astype(np.int16)
+        note_counts = np.bincount(owners, minlength=size)
+
+        # The played notes are still in excerpt order, so each excerpt is a contiguous slice
+        lowest_notes = np.full(size, -1, dtype=np.int16)
+        highest_notes = np.full(size, -1, dtype=np.int16)
+        pitch_class_masks = np.zeros(size, dtype=np.uint16)
+        with_notes = note_counts > 0
+        if with_notes.any():
+            starts = (np.cumsum(note_counts) - note_counts)[with_notes]
+            lowest_notes[with_notes] = np.minimum.reduceat(played_notes, starts)
+            highest_notes[with_notes] = np.maximum.reduceat(played_notes, starts)
+            pitch_class_masks[with_notes] = np.bitwise_or.reduceat(np.left_shift(1, played_notes % 12).astype(np.uint16), starts)
+
+        slots = (onsets[played] * ONSET_SLOTS // BAR_TICKS) % ONSET_SLOTS
+        onset_histograms = np.bincount(owners * ONSET_SLOTS + slots, minlength=size * ONSET_SLOTS).reshape(size, ONSET_SLOTS)
+        return cls(note_counts, lowest_notes, highest_notes, pitch_class_masks, durations, onset_histograms)
+
+    def select(self, shift=0, min_note=None, max_note=None, min_notes=None, max_notes=None, pitch_classes=None,
+               min_duration=None, max_duration=None, min_syncopation=None, max_syncopation=None):
+        '''
+        Returns a boolean array with the excerpts that match every given condition (None means no condition):
+        - min_note, max_note: range of MIDI notes the excerpt stays in, after shifting its notes by shift semitones.
+        - min_notes, max_notes: number of notes played.
+        - pitch_classes: pitch classes (0 to 11, after the shift) the excerpt may play, e.g. a scale.
+        - min_duration, max_duration: length in ticks.
+        - min_syncopation, max_syncopation: fraction of notes starting off the beat.
+        Excerpts without notes match any note range and pitch classes.
+        '''
+        keep = np.ones(len(self), dtype=bool)
+        silent = self.note_counts == 0
+        if min_note is not None:
+            keep &= silent | (self.lowest_notes + shift >= min_note)
+        if max_note is not None:
+            keep &= silent | (self.highest_notes + shift <= max_note)
+        if min_notes is not None:
+            keep &= self.note_counts >= min_notes
+        if max_notes is not None:
+            keep &= self.note_counts <= max_notes
+        if pitch_classes is not None:
+            allowed = 0
+            for pitch_class in pitch_classes:
+                allowed |= 1 << ((int(pitch_class) - shift) % 12)
+            keep &= (self.pitch_class_masks & ~np.uint16(allowed) & 0xFFF) == 0
+        if min_duration is not None:
+            keep &= self.durations >= min_duration
+        if max_duration is not None:
+            keep &= self.durations <= max_duration
+        if min_syncopation is not None:
+            keep &= self.syncopation >= min_syncopation
+        if max_syncopation is not None:
+            keep &= self.syncopation <= max_syncopation
+        return keep
@@ -0,0 +1,104 @@
+import bisect
+from music_generator.structures.midi_instrument_table import MIDI_INSTRUMENT_TABLE
+
+# Lookup tables built once from MIDI_INSTRUMENT_TABLE, so resolving an instrument never scans the table
+INSTRUMENT_PROGRAMS = {}    # Instrument name -> MIDI program number
+INSTRUMENT_NAMES = {}       # MIDI program number -> instrument name
+INSTRUMENT_CATEGORIES = {}  # Instrument name -> category
+CATEGORY_PROGRAMS = {}      # Category -> tuple of MIDI program numbers, in table order
+
+for _category, _instruments in MIDI_INSTRUMENT_TABLE.items():
+    CATEGORY_PROGRAMS[_category] = tuple(program for _, program in _instruments)
+    for _name, _program in _instruments:
+        INSTRUMENT_PROGRAMS[_name] = _program
+        INSTRUMENT_NAMES.setdefault(_program, _name)
+        INSTRUMENT_CATEGORIES[_name] = _category
+del _category, _instruments, _name, _program
+
+# Case-insensitive lookups: lower case name -> name, and the lower case names sorted for prefix search
+_NAMES_BY_KEY = {name.casefold(): name for name in INSTRUMENT_PROGRAMS}
+_SORTED_KEYS = sorted(_NAMES_BY_KEY)
+
+
+def instrument_program(name, default=None):
+
+    """
+    Returns the MIDI program number of an instrument, ignoring case and surrounding spaces.
+
+    Parameters:
+        name: The name of the instrument.
+        default: The value returned if there is no instrument with that name.
+
+    Returns:
+        The MIDI program number, or default.
+    """
+
+    program = INSTRUMENT_PROGRAMS.get(name)
+    if program is not None:
+        return program
+    canonical = _NAMES_BY_KEY.get(name.strip().casefold())
+    return default if canonical is None else INSTRUMENT_PROGRAMS[canonical]
+
+
+def instrument_name(program):
+
+    """
+    Returns the name of the instrument with a MIDI program number, or None if there is none.
+    """
+
+    return INSTRUMENT_NAMES.get(program)
+
+
+def category_programs(category):
+
+    """
+    Returns the MIDI program numbers of a category, in table order (an empty tuple if there is no such category).
+    """
+
+    return CATEGORY_PROGRAMS.get(category, ())
+
+
+def find_instruments(prefix, limit=None):
+
+    """
+    Finds the instruments whose name starts with a prefix, ignoring case.
+
+    Parameters:
+        prefix: The beginning of the name.
+        limit: The maximum number of names returned. Defaults to all of them.
+
+    Returns:
+        A list with the names of the instruments, in alphabetical order.
+    """
+
+    key = prefix.strip().casefold()
+    names = []
+    for i in range(bisect.bisect_left(_SORTED_KEYS, key), len(_SORTED_KEYS)):
+        if not _SORTED_KEYS[i].startswith(key) or (limit is not None and len(names) >= limit):
+            break
+        names.append(_NAMES_BY_KEY[_SORTED_KEYS[i]])
+    return names
+
+
+def resolve_instrument(name):
+
+    """
+    Resolves an instrument name written in any case to its name in the table and its MIDI program number.
+
+    Parameters:
+        name: The name of the instrument.
+
+    Returns:
+        name: The name of the instrument, as written in MIDI_INSTRUMENT_TABLE.
+        program: The MIDI program number.
+
+    Raises:
+        ValueError: If there is no instrument with that name. The message suggests names that start the same way.
+    """
+
+    canonical = name if name in INSTRUMENT_PROGRAMS else _NAMES_BY_KEY.get(name.strip().casefold())
+    if canonical is None:
+        suggestions = find_instruments(name, 5) or find_instruments(name.strip()[:3], 5)
+        hint = f" (did you mean {', '.join(suggestions)}?)" if suggestions else ""
+        raise ValueError(f"Unknown instrument: {name}{hint}")
+    return canonical, INSTRUMENT_PROGRAMS[canonical]
@@ -0,0 +1,151 @@
+import numpy as np
+from music_generator.structures.alias_sampler import AliasSampler
+
+
+class MarkovChain:
+    '''
+    Chooses each excerpt of a track depending on the previous ones (up to order of them).
+    The transitions of each order j = 1, ..., order are stored as a sparse CSR matrix with a row per context
+    (the j previous excerpts) and a column per excerpt, plus an alias table per row, so each bar costs O(1)
+    whatever the number of excerpts. When a context was never seen, the chain backs off to the shorter contexts
+    and, at the start of the sequence or if none was seen, to the independent probabilities of the track.
+    Attributes:
+        order (int): Number of previous excerpts the next one depends on.
+        size (int): Number of excerpts.
+        transitions (list): CSR matrix of weights of each order (transitions[j-1] for order j), rows normalized to 1.
+        contexts (list): Row of each context of each order, as dictionaries {tuple of excerpt indexes: row}.
+    Methods:
+        from_sequences(sequences, size, order, smoothing): Learns the chain from example sequences of excerpt indexes.
+        from_matrix(matrix): Builds a first order chain from a (dense or sparse) matrix of transition weights.
+        draw(length, rng, fallback, previous): Draws a sequence of excerpt indexes.
+    '''
+
+    def __init__(self, transitions, contexts):
+        '''
+        Initializes a new MarkovChain instance from the weight matrices and the contexts of each order (see Attributes).
+        Rows without weights are allowed, the chain backs off from them.
+        '''
+        self.order = len(transitions)
+        self.size = transitions[0].shape[1]
+        self.transitions = []
+        self.contexts = contexts
+        self._tables = []
+        for matrix in transitions:
+            matrix = matrix.tocsr()
+            matrix.sum_duplicates()
+            matrix.eliminate_zeros()
+            if matrix.nnz and matrix.data.min() < 0:
+                raise ValueError("Transition weights must be non-negative")
+            self.transitions.append(_normalize_rows(matrix))
+            self._tables.append(_alias_tables(self.transitions[-1]))
+
+    @classmethod
+    def from_sequences(cls, sequences, size, order=1, smoothing=0.0):
+        '''
+        Learns a chain from example sequences of excerpt indexes, counting the excerpts that follow each context.
+        A positive smoothing adds that weight to every transition from an observed first order context
+        (making the matrix dense, so it should stay small for large collections).
+        '''
+        from scipy import sparse
+        transitions = []
+        contexts = []
+        sequences = [[int(i) for i in sequence] for sequence in sequences]
+        for sequence in sequences:
+            if any(not 0 <= i < size for i in sequence):
+                raise ValueError(f"Excerpt index out of range in {sequence}")
+        for j in range(1, order + 1):
+            context_rows = {}
+            rows, columns = [], []
+            for sequence in sequences:
+                for t in range(j, len(sequence)):
+                    rows.append(context_rows.setdefault(tuple(sequence[t - j:t]), len(context_rows)))
+                    columns.append(sequence[t])
+            matrix = sparse.coo_matrix((np.ones(len(rows)), (rows, columns)), shape=(len(context_rows), size)).tocsr()
+            if smoothing > 0 and j == 1 and len(context_rows):
+                matrix = (matrix + sparse.csr_matrix(np.full(matrix.shape, smoothing))).tocsr()
+            transitions.append(matrix)
+            contexts.append(context_rows)
+        if not any(len(context_rows) for context_rows in contexts):
+            raise ValueError("The example sequences have no transitions")
+        return cls(transitions, contexts)
+
+    @classmethod
+    def from_matrix(cls, matrix):
+        '''
+        Builds a first order chain from a square matrix whose entry (i, k) is the weight of going from excerpt i to excerpt k.
+        '''
+        from scipy import sparse
+        matrix = sparse.csr_matrix(matrix, dtype=np.float64)
+        if matrix.shape[0] != matrix.shape[1]:
+            raise ValueError("The transition matrix must be square")
+        return cls([matrix], [{(i,): i for i in range(matrix.shape[0])}])
+
+    def draw(self, length, rng, fallback, previous=()):
+        '''
+        Draws a sequence of length excerpt indexes with a NumPy generator, continuing after the previous indexes.
+        fallback is the AliasSampler used when no context applies. Returns an array of indexes.
+        '''
+        uniforms = rng.random((length, 2))
+        history = [int(i) for i in previous][-self.order:] if self.order else []
+        chosen = np.empty(length, dtype=np.int64)
+        fallback_probabilities = fallback.probabilities
+        fallback_aliases = fallback.aliases
+        for t in range(length):
+            u, v = uniforms[t]
+            idx = -1
+            for j in range(min(self.order, len(history)), 0, -1):
+                row = self.contexts[j - 1].get(tuple(history[-j:]))
+                if row is not None:
+                    idx = self._draw_row(j - 1, row, u, v)
+                    if idx >= 0:
+                        break
+            if idx < 0:
+                column = min(int(u * fallback.size), fallback.size - 1)
+                idx = column if v < fallback_probabilities[column] else int(fallback_aliases[column])
+            chosen[t] = idx
+            history.append(idx)
+            if len(history) > self.order:
+                del history[0]
+        return chosen
+
+    def _draw_row(self, j, row, u, v):
+        '''
+        Draws from the alias table of a row of the order j+1 matrix. Returns -1 if the row has no weights.
+        '''
+        indptr, indices, probabilities, aliases = self._tables[j]
+        start = indptr[row]
+        count = indptr[row + 1] - start
+        if count == 0:
+            return -1
+        k = start + int(u * count)
+        if v >= probabilities[k]:
+            k = start + aliases[k]
+        return int(indices[k])
+
+
+def _normalize_rows(matrix):
+    '''
+    Divides each row of a CSR matrix by its sum (rows without weights stay empty).
+    '''
+    sums = np.asarray(matrix.sum(axis=1)).ravel()
+    counts = np.diff(matrix.indptr)
+    scale = np.divide(1.0, sums, out=np.zeros_like(sums), where=sums > 0)
+    matrix = matrix.copy()
+    matrix.data = matrix.data * np.repeat(scale, counts)
+    return matrix
+
+
+def _alias_tables(matrix):
+    '''
+    Builds the alias table of every row of a CSR matrix, stored next to its non-zero entries:
+    the probability of keeping each entry and the position of its alias inside the row.
+    '''
+    probabilities = np.ones(matrix.nnz, dtype=np.float64)
+    aliases = np.zeros(matrix.nnz, dtype=np.int64)
+    for row in range(matrix.shape[0]):
+        start, end = matrix.indptr[row], matrix.indptr[row + 1]
+        if end - start > 1:
+            sampler = AliasSampler(matrix.data[start:end])
+            probabilities[start:end] = sampler.probabilities
+            aliases[start:end] = sampler.aliases
+    return matrix.indptr, matrix.indices, probabilities, aliases
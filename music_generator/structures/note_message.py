@@ -1,3 +1,9 @@
+# Message types, stored in the excerpts as their index in this tuple
+MESSAGE_TYPES = ('note_off', 'note_on')
+MESSAGE_TYPE_CODES = {message_type: code for code, message_type in enumerate(MESSAGE_TYPES)}
+NOTE_OFF = MESSAGE_TYPE_CODES['note_off']
+NOTE_ON = MESSAGE_TYPE_CODES['note_on']
+
 class NoteMessage:
     '''
     Represents a note message. It is a wrapper around the mido Message class.
@@ -8,6 +14,8 @@ class NoteMessage:
         velocity (int): Velocity of the note.
         time (int): Time in ticks when the message should be played.
     '''
+    __slots__ = ('type', 'channel', 'note', 'velocity', 'time')
+
     def __init__(self, message):
         '''
         Initializes a new NoteMessage instance.
@@ -16,4 +24,17 @@ class NoteMessage:
         self.channel = message.channel
         self.note = message.note
         self.velocity = message.velocity
-        self.time = message.time
\ No newline at end of file
+        self.time = message.time
+
+    @classmethod
+    def from_values(cls, type, channel, note, velocity, time):
+        '''
+        Creates a NoteMessage instance from the values of each attribute.
+        '''
+        note_message = cls.__new__(cls)
+        note_message.type = type
+        note_message.channel = channel
+        note_message.note = note
+        note_message.velocity = velocity
+        note_message.time = time
+        return note_message
@@ -10,5 +10,16 @@ PROBABILITY_PRESETS_TABLE = {
     "Binomial, p=0.6": lambda track: track.set_binomial_probabilities(0.6),
     "Binomial, p=0.7": lambda track: track.set_binomial_probabilities(0.7),
     "Binomial, p=0.8": lambda track: track.set_binomial_probabilities(0.8),
-    "Binomial, p=0.9": lambda track: track.set_binomial_probabilities(0.9)
-}
\ No newline at end of file
+    "Binomial, p=0.9": lambda track: track.set_binomial_probabilities(0.9),
+    "Geometric, p=0.1": lambda track: track.set_geometric_probabilities(0.1),
+    "Geometric, p=0.3": lambda track: track.set_geometric_probabilities(0.3),
+    "Geometric, p=0.5": lambda track: track.set_geometric_probabilities(0.5),
+    "Zipf, s=1": lambda track: track.set_zipf_probabilities(1),
+    "Zipf, s=2": lambda track: track.set_zipf_probabilities(2),
+    "Random (Dirichlet)": lambda track: track.set_dirichlet_probabilities(1.0)
+}
+# Presets that draw random probabilities, applied from a seed by the job files and the command line,
+# so that the same seed always gives the same probabilities (and the same files)
+SEEDED_PRESETS = {
+    "Random (Dirichlet)": lambda track, seed: track.set_dirichlet_probabilities(1.0, seed)
+}
@@ -1,6 +1,9 @@
 import math
-from copy import deepcopy
-from music_generator.structures.midi_instrument_table import MIDI_INSTRUMENT_TABLE
+import numpy as np
+from music_generator.structures.instrument_index import instrument_program
+from music_generator.structures.alias_sampler import AliasSampler
+from music_generator.structures.distributions import distribution
+from music_generator.structures.markov_chain import MarkovChain
 
 class Track:
     '''
@@ -8,18 +11,33 @@ class Track:
     Attributes:
         name (str): Name of the track (instrument).
         midi_number (int): MIDI number of the instrument.
-        input_excerpts (ExcerptCollection): Collection of excerpts inputted into the program.
-        excerpts (list): List of ordered excerpts in the track in the final piece.
+        input_excerpts (ExcerptCollection): Collection of excerpts inputted into the program. It is shared, not copied, and never modified by the track.
+        excerpts (list): List of ordered excerpts in the track in the final piece (references to the input excerpts).
         octave (int): Octave of the track.
+        note_shift (int): Number of semitones added to every note when the track is exported.
         probabilities (list): List of probabilities for each input excerpt in the track.
+        probability_sum (float): Sum of the probabilities, kept up to date when they change instead of recomputed.
+        sampler (AliasSampler): Alias table built from the probabilities, used to choose the excerpts. Rebuilt only after the probabilities change.
+        markov_chain (MarkovChain): If set, each excerpt is chosen depending on the previous ones, and the probabilities
+            are only used for the first excerpt and when the chain has no transitions for the previous excerpts.
     Methods:
         set_name(name): Sets the name/instrument of the track and updates the MIDI number based on the name.
         set_probabilities(probabilities): Sets the probabilities for each input excerpt in the track.   
+        set_probability(idx, probability): Sets the probability of a single input excerpt.
+        update_probabilities(updates): Sets the probabilities of several input excerpts at once.
         set_discrete_uniform_probabilities(): Sets uniform probabilities for all excerpts in the track.
         set_first_only_probability(): Sets the probability of the first non-silent excerpt to 1 and all others to 0.
         set_last_only_probability(): Sets the probability of the last excerpt to 1 and all others to 0.
         set_binomial_probabilities(p): Sets the probabilities based on a binomial distribution with parameter p.  
-        set_octave(octave): Sets the octave for the track and adjusts the notes in the excerpts accordingly.
+        set_geometric_probabilities(p): Sets the probabilities based on a geometric distribution with parameter p.
+        set_zipf_probabilities(s): Sets the probabilities based on a Zipf distribution with exponent s.
+        set_dirichlet_probabilities(alpha, seed): Sets probabilities drawn from a symmetric Dirichlet distribution.
+        set_distribution(name, **params): Sets the probabilities and the sampler from a (cached) distribution.
+        filter_probabilities(**query): Keeps only the probabilities of the excerpts that match a query of their features.
+        set_octave(octave): Sets the octave for the track and the note shift applied to the excerpts on export.
+        set_markov_chain(markov_chain): Sets (or removes, with None) the Markov chain of the track.
+        learn_transitions(sequences, order, smoothing): Sets a Markov chain learned from example sequences of excerpts.
+        draw_sequence(length, rng, previous): Chooses the indexes of length excerpts.
         add_excerpt(excerpt): Adds an excerpt to the track.
         check_probabilities(): Checks if the sum of probabilities equals 1.
     '''
@@ -30,23 +48,51 @@ class Track:
         '''
         self.name = name
         self.midi_number = 0
-        self.input_excerpts = deepcopy(input_excerpts)
+        self.input_excerpts = input_excerpts
         self.excerpts = []
         self.octave = 0
+        self.note_shift = 0
         self.probabilities = []
+        self.markov_chain = None
+
+    @property
+    def probabilities(self):
+        '''
+        List of probabilities for each input excerpt in the track.
+        '''
+        return self._probabilities
+
+    @probabilities.setter
+    def probabilities(self, probabilities):
+        '''
+        Sets the probabilities and discards the sampler built from the previous ones.
+        '''
+        self._probabilities = probabilities
+        self._probability_sum = math.fsum(probabilities)
+        self._sampler = None
+
+    @property
+    def probability_sum(self):
+        '''
+        Sum of the probabilities, updated incrementally by set_probability and update_probabilities.
+        '''
+        return self._probability_sum
+
+    @property
+    def sampler(self):
+        '''
+        Returns the alias sampler for the current probabilities, building it if needed.
+        '''
+        if self._sampler is None:
+            self._sampler = AliasSampler(self._probabilities)
+        return self._sampler
 
     def set_name(self, name):
         '''
-        Sets the name/instrument of the track and updates the MIDI number based on the name. If no instrument is found, defaults to 0.
+        Sets the name/instrument of the track and updates the MIDI number based on the name (ignoring case). If no instrument is found, defaults to 0.
         '''
         self.name = name
-        for instruments in MIDI_INSTRUMENT_TABLE.values():
-            for inst_name, midi_number in instruments:
-                if inst_name == name:
-                    self.midi_number = midi_number
-                    return
-
-        self.midi_number = 0
+        self.midi_number = instrument_program(name, 0)
 
     def set_probabilities(self, probabilities):
         '''
@@ -55,57 +101,143 @@ class Track:
         if len(probabilities) != len(self.input_excerpts.excerpts): return
         self.probabilities = probabilities
 
+    def set_probability(self, idx, probability):
+        '''
+        Sets the probability of a single input excerpt in the track.
+        '''
+        self._probability_sum += probability - self._probabilities[idx]
+        self._probabilities[idx] = probability
+        self._sampler = None
+
+    def update_probabilities(self, updates):
+        '''
+        Sets the probabilities of several input excerpts at once, given as a dictionary {idx: probability}.
+        '''
+        for idx, probability in updates.items():
+            self._probability_sum += probability - self._probabilities[idx]
+            self._probabilities[idx] = probability
+        self._sampler = None
+
+    def set_distribution(self, name, **params):
+        '''
+        Sets the probabilities from a distribution of the distributions module (e.g. "binomial" with p=0.3).
+        The distribution and its alias sampler are cached, so applying the same one again does not recompute them.
+        '''
+        dist = distribution(name, len(self.input_excerpts.excerpts), **params)
+        self.probabilities = dist.probabilities.tolist()
+        self._sampler = dist.sampler
+
     def set_discrete_uniform_probabilities(self):
         '''
         Sets uniform probabilities for all excerpts in the track.
         '''
         if not self.input_excerpts:
             return
-        probability = 1 / len(self.input_excerpts.excerpts)
-        self.probabilities = [probability] * len(self.input_excerpts.excerpts)
+        self.set_distribution("uniform")
 
     def set_first_only_probability(self):
         '''
         Sets the probability of the first non-silent excerpt to 1 and all others to 0.'''
-        self.probabilities = [1 if i == 1 else 0 for i in range(len(self.input_excerpts.excerpts))]
+        self.set_distribution("point", index=1)
 
     def set_last_only_probability(self):
         '''
         Sets the probability of the last excerpt to 1 and all others to 0.'''
-        self.probabilities = [1 if i == len(self.input_excerpts.excerpts) - 1 else 0 for i in range(len(self.input_excerpts.excerpts))]
+        self.set_distribution("point", index=len(self.input_excerpts.excerpts) - 1)
 
     def set_binomial_probabilities(self, p):
         '''
         Sets the probabilities based on a binomial distribution with parameter p.
         '''
-        n = len(self.input_excerpts.excerpts)
-        self.probabilities = [math.comb(n - 1, k) * (p ** k) * ((1 - p) ** (n - 1 - k)) for k in range(n)]
+        self.set_distribution("binomial", p=p)
+
+    def set_geometric_probabilities(self, p):
+        '''
+        Sets the probabilities based on a geometric distribution with parameter p, truncated to the number of excerpts.
+        '''
+        self.set_distribution("geometric", p=p)
+
+    def set_zipf_probabilities(self, s):
+        '''
+        Sets the probability of the k-th excerpt proportional to 1 / (k+1)^s.
+        '''
+        self.set_distribution("zipf", s=s)
+
+    def set_dirichlet_probabilities(self, alpha=1.0, seed=None):
+        '''
+        Sets probabilities drawn from a symmetric Dirichlet distribution with parameter alpha. Without a seed they are new each time.
+        '''
+        self.set_distribution("dirichlet", alpha=alpha, seed=seed)
+
+    def filter_probabilities(self, **query):
+        '''
+        Sets to 0 the probabilities of the excerpts that do not match a query of the feature index of the input excerpts
+        (see ExcerptFeatures.select) and normalizes the others, in one vectorized pass.
+        Note ranges and pitch classes refer to the notes as the track plays them (in its octave), so set the octave first.
+        '''
+        keep = self.input_excerpts.features().select(shift=self.note_shift, **query)
+        probabilities = np.where(keep, np.asarray(self._probabilities, dtype=np.float64), 0.0)
+        total = probabilities.sum()
+        if total <= 0:
+            raise ValueError(f"No excerpt with a probability matches the query: {query}")
+        self.probabilities = (probabilities / total).tolist()
+
+    def set_markov_chain(self, markov_chain):
+        '''
+        Sets the Markov chain used to choose the excerpts, or None to choose them independently.
+        '''
+        if markov_chain is not None and markov_chain.size != len(self.input_excerpts.excerpts):
+            raise ValueError(f"The Markov chain has {markov_chain.size} excerpts, the track has {len(self.input_excerpts.excerpts)}")
+        self.markov_chain = markov_chain
+
+    def learn_transitions(self, sequences, order=1, smoothing=0.0):
+        '''
+        Sets a Markov chain learned from example sequences. Each sequence is a list of excerpt indexes or names.
+        '''
+        names = None
+        indexed_sequences = []
+        for sequence in sequences:
+            if any(isinstance(item, str) for item in sequence):
+                if names is None:
+                    names = {excerpt.name: i for i, excerpt in enumerate(self.input_excerpts.excerpts)}
+                missing = [item for item in sequence if isinstance(item, str) and item not in names]
+                if missing:
+                    raise ValueError(f"Unknown excerpts: {', '.join(missing)}")
+                sequence = [names[item] if isinstance(item, str) else item for item in sequence]
+            indexed_sequences.append(sequence)
+        self.set_markov_chain(MarkovChain.from_sequences(indexed_sequences, len(self.input_excerpts.excerpts), order, smoothing))
+
+    def draw_sequence(self, length, rng, previous=()):
+        '''
+        Chooses the indexes of length excerpts with a NumPy generator, independently or with the Markov chain.
+        previous are the indexes chosen before (used by the Markov chain when the sequence is drawn in blocks).
+        Returns an array of indexes.
+        '''
+        if self.markov_chain is None:
+            return self.sampler.draw_k(length, rng)
+        return self.markov_chain.draw(length, rng, self.sampler, previous)
 
     def set_octave(self, octave):
         '''
-        Sets the octave for the track and adjusts the notes in the excerpts accordingly.
+        Sets the octave for the track. The lowest note of the input excerpts is moved to the chosen octave when the track is exported,
+        the excerpts themselves are left untouched.
         '''
         self.octave = octave
-        all_messages = [msg for excerpt in self.input_excerpts.excerpts for msg in excerpt.messages]
-        if not all_messages:
+        lowest_note = self.input_excerpts.lowest_note()
+        if lowest_note is None:
             return
-        LowestNote = min(all_messages, key=lambda x: x.note)
-        offset = 12 * math.floor(LowestNote.note / 12)
-        for msg in all_messages:
-            msg.note = msg.note - offset
-            msg.note = msg.note + ((octave + 1) * 12)
-            msg.note = max(0, min(127, msg.note))
+        offset = 12 * math.floor(lowest_note / 12)
+        self.note_shift = (octave + 1) * 12 - offset
 
     def add_excerpt(self, excerpt):
         '''
-        Adds an excerpt to the track.
+        Adds an excerpt to the track. Only a reference is stored, the excerpt is shared with the input excerpts.
         '''
-        self.excerpts.append(deepcopy(excerpt))
+        self.excerpts.append(excerpt)
 
     def check_probabilities(self):
         '''
         Checks if the sum of probabilities equals 1, accounting for floating point arithmetic.
         Returns True if the sum is close to 1, otherwise False.
         '''
-        total = sum(self.probabilities)
-        return math.isclose(total, 1.0, rel_tol=1e-9, abs_tol=1e-9)
+        return math.isclose(self._probability_sum, 1.0, rel_tol=1e-9, abs_tol=1e-9)
@@ -8,4 +8,5 @@ from .create import(
     create_boxes,
     create_button,
     create_controls
-)
\ No newline at end of file
+)
+from .generation_queue import GenerationQueue
\ No newline at end of file
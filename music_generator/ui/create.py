@@ -1,9 +1,10 @@
 import tkinter as tk
 import ttkbootstrap as ttk
 from music_generator.structures import Track
-from music_generator.structures.midi_instrument_table import MIDI_INSTRUMENT_TABLE
+from music_generator.structures.instrument_index import CATEGORY_PROGRAMS, INSTRUMENT_NAMES
 from music_generator.structures.probability_presets import PROBABILITY_PRESETS_TABLE
-from music_generator.files import generate
+from music_generator.ui.generation_queue import GenerationQueue
+from music_generator.ui.probability_table import ProbabilityTable
 
 
 def create_window(width, height, title, composition=None, tracks=None):
@@ -81,6 +82,7 @@ def create_notebook(frame, composition=None, tracks=None):
     '''
     Creates a notebook widget with tabs for each track.
     Each tab contains controls for setting the track's octave, instrument, and probabilities.
+    The content of a tab is only created the first time the tab is shown.
     
     Parameters:
     - frame (ttk.Frame): The frame where the notebook will be placed.
@@ -93,11 +95,24 @@ def create_notebook(frame, composition=None, tracks=None):
     '''
 
     notebook = ttk.Notebook(frame)
+    tab_frames = []
     for i in range(len(tracks)):
+        tracks[i].set_discrete_uniform_probabilities()
         tab_frame = ttk.Frame(notebook)
         notebook.add(tab_frame, text=f'Track {i+1}')  # Add tab first
-        create_notebook_tab(notebook, tab_frame, tracks, i)
-    
+        tab_frames.append(tab_frame)
+
+    # Create the content of each tab when it is first selected
+    created = set()
+    def tab_changed(event):
+        i = notebook.index(notebook.select())
+        if i not in created:
+            created.add(i)
+            create_notebook_tab(notebook, tab_frames[i], tracks, i)
+    notebook.bind("<<NotebookTabChanged>>", tab_changed)
+    if tab_frames:
+        tab_changed(None)
+
     return notebook, tracks
 
 def create_controls(master, composition, tracks):
@@ -129,39 +144,21 @@ def create_notebook_tab(Notebook, frame, track, idx):
     - idx (int): The index of the track in the list.       
     '''
 
-    # Set up the frame with a canvas and scrollbar for scrolling content
-    frame.rowconfigure(0, weight=1)
-    frame.columnconfigure(0, weight=1)
-    canvas = tk.Canvas(frame, highlightthickness=0)
-    canvas.grid(row=0, column=0, sticky="nsew")
-    scrollbar = ttk.Scrollbar(frame, orient="vertical", command=canvas.yview)
-    scrollbar.grid(row=0, column=1, sticky="ns")
-    canvas.configure(yscrollcommand=scrollbar.set)
-
-    # Content frame inside the canva
-    content_frame = ttk.Frame(canvas)
-    canvas.create_window((0, 0), window=content_frame, anchor="nw", tags="content_frame")
-
-    # Ensure the canvas scrollregion updates with content
-    content_frame.bind("<Configure>", lambda event: update_canvas_size(event, canvas))
-    canvas.bind("<Configure>", lambda e: canvas.itemconfig("content_frame", width=canvas.winfo_width()))
-
-    # Center all content in the notebook tab
-    inner = ttk.Frame(content_frame)
+    # Center all content in the notebook tab. The probability table scrolls by itself
+    inner = ttk.Frame(frame)
     inner.pack(anchor="center", padx=15, pady=10, fill="both", expand=True)
 
     # Create the track controls
-    track[idx].set_discrete_uniform_probabilities()
     create_octave_list(inner, "Set Octave", track[idx])
     create_instrument_list(inner, "Set Instrument", track[idx])
     preset_menu = create_probability_list(inner, "Set probabilities", track[idx])
-    prob_bars, prob_entries = create_probability_table(inner, track[idx])
+    prob_table = create_probability_table(inner, track[idx])
 
     # Add preset commands to the menu
     for preset_name in PROBABILITY_PRESETS_TABLE.keys():
         preset_menu.add_command(
             label=preset_name,
-            command=lambda val=preset_name: apply_preset(val, prob_entries, prob_bars, track[idx])
+            command=lambda val=preset_name: apply_preset(val, prob_table, track[idx])
         )
 
 
@@ -208,21 +205,30 @@ def create_instrument_list(frame, title, track):
     selected = ttk.StringVar(value="Piano")
     
     # Create a menubutton with a menu containing all instruments
-    # The menu will be populated with categories and instruments from MIDI_INSTRUMENT_TABLE
+    # The menu has a submenu per category (see the instrument index), filled the first time it is opened
     menubutton = ttk.Menubutton(row, textvariable=selected)
     menu = tk.Menu(menubutton, tearoff=0)
     
-    for categories, instruments in MIDI_INSTRUMENT_TABLE.items():
-        if not instruments:
+    for category, programs in CATEGORY_PROGRAMS.items():
+        if not programs:
             continue
         submenu = tk.Menu(menu, tearoff=0)
-        for inst_name, _ in instruments:
-            submenu.add_command(label=inst_name,command=lambda name=inst_name: update_instrument(name, selected, track))
-        menu.add_cascade(label=categories, menu=submenu)
+        submenu.configure(postcommand=lambda submenu=submenu, programs=programs: fill_instrument_menu(submenu, programs, selected, track))
+        menu.add_cascade(label=category, menu=submenu)
     
     menubutton["menu"] = menu
     menubutton.pack(side='left')
 
+def fill_instrument_menu(submenu, programs, selected, track):
+    '''
+    Adds the instruments of a category to its submenu, only the first time the submenu is opened.
+    '''
+    if submenu.index("end") is not None:
+        return
+    for program in programs:
+        inst_name = INSTRUMENT_NAMES[program]
+        submenu.add_command(label=inst_name, command=lambda name=inst_name: update_instrument(name, selected, track))
+
 def create_probability_list(frame, title, track):
     '''
     Creates a dropdown menu for applying probability presets to a track.
@@ -256,53 +262,23 @@ def create_probability_table(parent, track):
     - A label for the excerpt name
     - An entry for editing the probability value
     - A progress bar for visualizing the probability value
+    Only the visible rows are created, and they are reused when the table is scrolled (see ProbabilityTable).
+    The edits are applied to the track in batches, shortly after the user stops typing.
     Parameters:
     - parent (ttk.Frame): The frame where the table will be placed.
     - track (Track): The track object containing the excerpts and their probabilities.
     Returns:
-    - prob_bars (list): List of progress bars for each excerpt.
-    - prob_entries (list): List of StringVars for each excerpt's probability entry.
+    - prob_table (ProbabilityTable): The table.
     '''
-    
-    # Initialize lists to store labels, entries, and progress bars
-    excerpt_labels = []
-    prob_entries = []
-    prob_bars = []
-
-    # Create an outer frame to hold the excerpt rows
-    outer_frame = ttk.LabelFrame(parent, borderwidth=2, relief="groove", text="")
-    outer_frame.pack(pady=10, fill='x', expand=True)  
-
-    # Create a row for each excerpt in the track
-    for i, excerpt in enumerate(track.input_excerpts.excerpts):
-
-        # Create a row frame for each excerpt
-        row_frame = ttk.Frame(outer_frame)
-        row_frame.pack(fill='x', expand=True, pady=2) 
-
-        # Create a label for each excerpt
-        label = ttk.Label(row_frame, text=str(excerpt.name).replace('_', ' ').title(), width=20, anchor='w')
-        label.pack(side='left', padx=5)
-
-        # Create an entry for editing the probability value
-        prob_var = ttk.StringVar(value=str(track.probabilities[i]))
-        entry = ttk.Entry(row_frame, textvariable=prob_var, width=5)
-        entry.pack(side='left', padx=5)
-
-        # Create a progress bar for visualizing the probability value
-        bar = ttk.Progressbar(row_frame, orient='horizontal', mode='determinate')
-        bar['maximum'] = 1.0
-        bar['value'] = track.probabilities[i]
-        bar.pack(side='left', padx=5, fill='x', expand=True)
-        prob_bars.append(bar)
-        prob_entries.append(prob_var)
-        excerpt_labels.append(label)
-
-        # Bind the entry to update the probability value in the track when edited
-        prob_var.trace_add('write',
-         lambda *args, var=prob_var, idx=i: update_probability(var, idx, prob_bars, track))
-        
-    return prob_bars, prob_entries
+
+    prob_table = ProbabilityTable(parent, track)
+
+    # Update the probability values in the track when entries are edited
+    prob_table.on_edit(lambda edits: update_probabilities(edits, track))
+
+    # Store the table, so pending edits can be applied before generating
+    track._prob_table = prob_table
+    return prob_table
 
 def create_boxes(master, composition):
     '''
@@ -374,13 +350,17 @@ def create_boxes(master, composition):
 
 def create_button(master, Composition, Tracks):
     '''
-    Creates a button to generate the composition based on the settings and tracks.
+    Creates a button to generate the composition based on the settings and tracks, and a button to cancel the generation.
+    The generations run in a background thread; pressing the button while one is running queues another one.
     Parameters:
     - master (ttk.Frame): The frame where the button will be placed.
     - Composition (Composition): The composition object to be edited.
+    - Tracks (list of Track): List of tracks used in the generation.
+    Returns:
+    - Composition (Composition): The composition object.
     '''
 
-    # Create an outer frame to hold the button and status box
+    # Create an outer frame to hold the buttons, the status box and the progress bar
     outer_frame = ttk.Frame(master)
     outer_frame.grid(row=1, column=0, pady=20, sticky="ew")
     outer_frame.grid_columnconfigure(0, weight=1)
@@ -389,17 +369,22 @@ def create_button(master, Composition, Tracks):
     status_box = ttk.Label(outer_frame, text="", width=30, font=("Arial", 10), anchor="center", justify="center")
     status_box.grid(row=0, column=0, pady=5, columnspan=2, sticky="ew")
 
-    # Create a button to generate the composition
-    export_button = ttk.Button(outer_frame, text="Generate Composition", command=lambda: generate_button_pressed(Tracks, Composition, status_box), bootstyle="primary")
-    export_button.grid(row=1, column=0, sticky="ew", padx=5)
+    # Create a progress bar for the generation being run
+    progress_bar = ttk.Progressbar(outer_frame, orient='horizontal', mode='determinate', maximum=1.0)
+    progress_bar.grid(row=1, column=0, pady=5, columnspan=2, sticky="ew", padx=5)
 
+    # The generations are run by a background thread, whose events are read by the main loop
+    generation_queue = GenerationQueue("output")
+    generation_queue.poll(outer_frame, lambda event: update_generation_status(event, generation_queue, status_box, progress_bar))
+
+    # Create a button to generate the composition and a button to cancel it
+    export_button = ttk.Button(outer_frame, text="Generate Composition", command=lambda: generate_button_pressed(Tracks, Composition, status_box, generation_queue), bootstyle="primary")
+    export_button.grid(row=2, column=0, sticky="ew", padx=5)
+    cancel_button = ttk.Button(outer_frame, text="Cancel", command=generation_queue.cancel_current, bootstyle="secondary")
+    cancel_button.grid(row=2, column=1, sticky="ew", padx=5)
+
+    return Composition
 
-def update_canvas_size(event, canvas):
-    '''
-    Updates the canvas scroll region and content frame width when the content frame is resized.
-    '''
-    canvas.configure(scrollregion=canvas.bbox("all"))
-    canvas.itemconfig("content_frame", width=canvas.winfo_width())
 
 def update_octave(oct, selected, track):
     '''
@@ -414,47 +399,44 @@ def update_instrument(name, selected, track):
     selected.set(name)
     track.set_name(name)
 
-def apply_preset(preset_name, prob_entries, prob_bars, track):
+def apply_preset(preset_name, prob_table, track):
     '''
-    Applies a probability preset to the track and updates the entries and bars accordingly.
+    Applies a probability preset to the track and updates the visible entries and bars accordingly.
     '''
     preset_func = PROBABILITY_PRESETS_TABLE.get(preset_name)
     if not preset_func:
         ttk.messagebox.showerror("Error", "Unknown preset")
         return
+    prob_table.discard_edits()
     preset_func(track)
-    for i, v in enumerate(track.probabilities):
-        prob_entries[i].set(str(round(v, 4)))
-        prob_bars[i]['value'] = v
+    prob_table.refresh()
 
-def update_probability(var, idx, prob_bars, track):
+def update_probabilities(edits, track):
     '''
-    Updates the probability value of a track excerpt based on the entry field input.
+    Updates the probability values of track excerpts based on a batch of entry field inputs {idx: text}.
+    Empty entries count as 0, values are limited to [0, 1] and entries that are not numbers are ignored.
     '''
-    val_str = var.get()
-    if val_str.strip() == "":
-        prob_bars[idx]['value'] = 0
-        track.probabilities[idx] = 0
-        return
-    try:
-        val = float(val_str)
-        if val < 0:
-            val = 0
-        elif val > 1:
-            val = 1
-        track.probabilities[idx] = val
-        prob_bars[idx]['value'] = val
-        var.set(str(val)) 
-    except:
-        pass
+    values = {}
+    for idx, val_str in edits.items():
+        if val_str.strip() == "":
+            values[idx] = 0
+            continue
+        try:
+            values[idx] = min(max(float(val_str), 0), 1)
+        except ValueError:
+            pass
+    track.update_probabilities(values)
 
-def generate_button_pressed(Tracks, Composition, status_box):
+def generate_button_pressed(Tracks, Composition, status_box, generation_queue):
     '''
-    Generates the composition based on the settings and tracks when the button is pressed.
+    Queues the generation of the composition based on the settings and tracks when the button is pressed.
     '''
     for idx, track in enumerate(Tracks[:Composition.max_tracks]):
+        # Apply the edits still waiting for the typing delay
+        if getattr(track, "_prob_table", None) is not None:
+            track._prob_table.apply_edits()
         if not track.check_probabilities():
-            total = sum(track.probabilities)
+            total = track.probability_sum
             status_box.config(text=f"Sum in track {idx+1} {total:.4f} (should be 1)", bootstyle="danger")
             return 
 
@@ -467,8 +449,30 @@ def generate_button_pressed(Tracks, Composition, status_box):
         Composition.length = int(Composition._length_var.get())
     except ValueError:
         Composition.length = 16
-    generate(Composition, Tracks)
-    status_box.config(text="Track generated succesfully!", bootstyle="success")
+    generation_queue.submit(Composition, Tracks)
+    if generation_queue.current is not None:
+        status_box.config(text=f"Generation queued ({generation_queue.pending} waiting)", bootstyle="info")
+
+def update_generation_status(event, generation_queue, status_box, progress_bar):
+    '''
+    Shows an event of the background generations in the status box and the progress bar. Runs in the main loop.
+    '''
+    kind, name = event[0], event[1]
+    if kind == "started":
+        progress_bar['value'] = 0
+        waiting = f" ({event[2]} waiting)" if event[2] else ""
+        status_box.config(text=f"Generating {name}...{waiting}", bootstyle="info")
+    elif kind == "progress":
+        progress_bar['value'] = event[2] / event[3] if event[3] else 1.0
+    elif kind == "finished":
+        progress_bar['value'] = 1.0
+        status_box.config(text=f"Track generated succesfully! (seed {event[2]})", bootstyle="success")
+    elif kind == "cancelled":
+        progress_bar['value'] = 0
+        status_box.config(text=f"Generation of {name} cancelled", bootstyle="warning")
+    elif kind == "failed":
+        progress_bar['value'] = 0
+        status_box.config(text=f"Generation of {name} failed: {event[2]}", bootstyle="danger")
 
 
 
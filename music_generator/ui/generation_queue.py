@@ -0,0 +1,151 @@
+import os
+import queue
+import threading
+from music_generator.structures import Composition, Track
+from music_generator.files import export_stream, GenerationCancelled
+from music_generator.files.export_file import clean_file_name
+
+
+class GenerationQueue:
+    '''
+    Runs the generations requested by the GUI one after the other in a background thread, so the window never freezes.
+    Tk widgets are not thread safe, so the worker thread never touches them: it puts events in a queue that the
+    main loop reads with root.after (see poll).
+    Attributes:
+        output_folder (str): Folder where the MIDI files are saved.
+        jobs (queue.Queue): Generations waiting to be run.
+        events (queue.Queue): Events sent by the worker thread to the main loop.
+        pending (int): Number of generations waiting to be run.
+        current (dict): The generation being run, or None.
+    Methods:
+        submit(composition, tracks): Queues a generation with a snapshot of the composition and the tracks. Returns its seed.
+        cancel_current(): Cancels the generation being run.
+        cancel_all(): Cancels the generation being run and every queued generation.
+        poll(widget, on_event, interval): Delivers the events to on_event from the main loop, every interval milliseconds.
+    Events (tuples whose first item is the kind):
+        ("started", name, pending), ("progress", name, done, total), ("finished", name, seed, file_path),
+        ("cancelled", name), ("failed", name, message).
+    '''
+
+    def __init__(self, output_folder="output"):
+        '''
+        Initializes a new GenerationQueue instance. The worker thread is started by the first submit.
+        '''
+        self.output_folder = output_folder
+        self.jobs = queue.Queue()
+        self.events = queue.Queue()
+        self.pending = 0
+        self.current = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, composition, tracks):
+        '''
+        Queues a generation. The composition and the tracks are copied, so they can be edited while it runs.
+        Returns the seed of the generation.
+        '''
+        seed = composition.generation_seed()
+        job = {
+            "composition": _copy_composition(composition),
+            "tracks": [_copy_track(track) for track in tracks[:composition.max_tracks]],
+            "seed": seed,
+            "cancel": threading.Event()
+        }
+        with self._lock:
+            self.pending += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        self.jobs.put(job)
+        return seed
+
+    def cancel_current(self):
+        '''
+        Cancels the generation being run. Its partially written file is removed.
+        '''
+        with self._lock:
+            if self.current is not None:
+                self.current["cancel"].set()
+
+    def cancel_all(self):
+        '''
+        Cancels the generation being run and every queued generation.
+        '''
+        while True:
+            try:
+                job = self.jobs.get_nowait()
+            except queue.Empty:
+                break
+            self.events.put(("cancelled", job["composition"].name))
+            with self._lock:
+                self.pending -= 1
+        self.cancel_current()
+
+    def poll(self, widget, on_event, interval=50):
+        '''
+        Delivers the pending events to on_event(event) and schedules itself again with widget.after.
+        Must be called from the main loop.
+        '''
+        while True:
+            try:
+                event = self.events.get_nowait()
+            except queue.Empty:
+                break
+            on_event(event)
+        widget.after(interval, self.poll, widget, on_event, interval)
+
+    def _run(self):
+        '''
+        Runs the queued generations in the worker thread.
+        '''
+        while True:
+            job = self.jobs.get()
+            with self._lock:
+                self.pending -= 1
+                self.current = job
+            name = job["composition"].name
+            self.events.put(("started", name, self.pending))
+            file_path = os.path.join(self.output_folder, f"{clean_file_name(name)}.mid")
+
+            def progress(done, total):
+                if job["cancel"].is_set():
+                    raise GenerationCancelled()
+                self.events.put(("progress", name, done, total))
+
+            try:
+                export_stream(file_path, job["composition"], job["tracks"], job["seed"], progress=progress)
+                self.events.put(("finished", name, job["seed"], file_path))
+            except GenerationCancelled:
+                self.events.put(("cancelled", name))
+            except Exception as error:
+                self.events.put(("failed", name, str(error)))
+            finally:
+                with self._lock:
+                    self.current = None
+
+
+def _copy_composition(composition):
+    '''
+    Returns a copy of the settings of a composition, without its tracks.
+    '''
+    copy = Composition()
+    copy.set_name(composition.name)
+    copy.set_bpm(composition.bpm)
+    copy.set_length(composition.length)
+    copy.set_max_tracks(composition.max_tracks)
+    copy.set_seed(composition.seed)
+    copy.set_constraints(composition.constraints)
+    return copy
+
+
+def _copy_track(track):
+    '''
+    Returns a copy of the settings of a track. The input excerpts are shared.
+    '''
+    copy = Track(track.name, track.input_excerpts)
+    copy.midi_number = track.midi_number
+    copy.octave = track.octave
+    copy.note_shift = track.note_shift
+    copy.set_probabilities(list(track.probabilities))
+    copy.markov_chain = track.markov_chain
+    return copy
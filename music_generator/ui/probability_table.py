@@ -0,0 +1,206 @@
+import ttkbootstrap as ttk
+
+# Milliseconds without typing before the edited entries are applied to the track
+EDIT_DELAY = 250
+
+
+class ProbabilityTable:
+    '''
+    Table for displaying and editing the probabilities of the excerpts of a track.
+    Only the rows that fit in the window are created. When the table is scrolled the same rows are reused
+    for other excerpts, so opening a track with thousands of excerpts is as fast as opening one with ten.
+    Each row contains:
+    - A label for the excerpt name
+    - An entry for editing the probability value
+    - A progress bar for visualizing the probability value
+    Edits are not applied on every keystroke: they are collected and applied together EDIT_DELAY milliseconds
+    after the last one, followed by a single redraw.
+    Attributes:
+        track (Track): The track whose probabilities are displayed.
+        frame (ttk.LabelFrame): The frame holding the rows and the scrollbar.
+        rows (list): The row widgets, as dictionaries with label, var, entry and bar.
+        first (int): Index of the excerpt shown in the first row.
+        visible (int): Number of rows that fit in the frame.
+        pending (dict): Texts of the edited entries not applied yet, by excerpt index.
+    Methods:
+        refresh(): Shows the current probabilities of the track and their sum in the visible rows.
+        scroll_to(first): Shows the excerpts starting at index first.
+        on_edit(callback): Sets the function callback(edits) that applies a batch of edits {idx: text} to the track.
+        apply_edits(): Applies the pending edits now.
+        discard_edits(): Forgets the pending edits.
+    '''
+
+    def __init__(self, parent, track):
+        '''
+        Initializes a new ProbabilityTable instance and places it in the parent frame.
+        '''
+        self.track = track
+        self.rows = []
+        self.first = 0
+        self.visible = 1
+        self._row_height = None
+        self._updating = False
+        self._edit_callback = None
+        self.pending = {}
+        self._after_id = None
+
+        # Create an outer frame with the rows on the left and the scrollbar on the right
+        self.frame = ttk.LabelFrame(parent, borderwidth=2, relief="groove", text="")
+        self.frame.pack(pady=10, fill='both', expand=True)
+        self.frame.rowconfigure(0, weight=1)
+        self.frame.columnconfigure(0, weight=1)
+        self._body = ttk.Frame(self.frame)
+        self._body.grid(row=0, column=0, sticky="nsew")
+        self._body.grid_propagate(False)  # The height of the table never depends on its rows
+        self._body.columnconfigure(2, weight=1)
+        self._scrollbar = ttk.Scrollbar(self.frame, orient="vertical", command=self._scrollbar_moved)
+        self._scrollbar.grid(row=0, column=1, sticky="ns")
+        self._sum_label = ttk.Label(self.frame, text="", anchor='e')
+        self._sum_label.grid(row=1, column=0, columnspan=2, padx=5, sticky="ew")
+
+        # The number of rows depends on the height of the frame
+        self._body.bind("<Configure>", self._resized)
+        self._bind_wheel(self._body)
+        self._add_row()
+        self.refresh()
+
+    def on_edit(self, callback):
+        '''
+        Sets the function callback(edits) called with the pending edits, as a dictionary {idx: text}.
+        '''
+        self._edit_callback = callback
+
+    def apply_edits(self):
+        '''
+        Applies the pending edits in a single call of the edit callback, then redraws the table once.
+        '''
+        self._after_id = None
+        edits, self.pending = self.pending, {}
+        if edits and self._edit_callback is not None:
+            self._edit_callback(edits)
+        self.refresh()
+
+    def discard_edits(self):
+        '''
+        Forgets the pending edits, e.g. before a preset replaces every probability.
+        '''
+        if self._after_id is not None:
+            self.frame.after_cancel(self._after_id)
+            self._after_id = None
+        self.pending = {}
+
+    def refresh(self):
+        '''
+        Shows the names and the current probabilities of the excerpts in the visible rows, and their sum.
+        The entry being typed in keeps its text until it loses the focus.
+        '''
+        excerpts = self.track.input_excerpts.excerpts
+        probabilities = self.track.probabilities
+        focused = self.frame.focus_get()
+        self._updating = True
+        for r, row in enumerate(self.rows):
+            idx = self.first + r
+            if r < self.visible and idx < len(excerpts):
+                row["label"].config(text=str(excerpts[idx].name).replace('_', ' ').title())
+                value = probabilities[idx] if idx < len(probabilities) else 0
+                if row["entry"] is not focused and idx not in self.pending:
+                    row["var"].set(str(round(value, 4)))
+                row["bar"]['value'] = value
+                self._show_row(row, r)
+            else:
+                self._hide_row(row)
+        self._updating = False
+        self._update_scrollbar()
+
+        # The sum is cached by the track, so this does not go through every probability
+        total = self.track.probability_sum
+        self._sum_label.config(text=f"Sum: {total:.4f}", bootstyle="default" if self.track.check_probabilities() else "danger")
+
+    def scroll_to(self, first):
+        '''
+        Shows the excerpts starting at index first, limited so the last rows are never empty.
+        The pending edits are applied first, because the rows are about to show other excerpts.
+        '''
+        if self.pending:
+            self.apply_edits()
+        first = max(0, min(int(first), len(self.track.input_excerpts.excerpts) - self.visible))
+        if first != self.first:
+            self.first = first
+            self.refresh()
+
+    def _add_row(self):
+        '''
+        Creates the widgets of a new row.
+        '''
+        r = len(self.rows)
+        label = ttk.Label(self._body, text="", width=20, anchor='w')
+        var = ttk.StringVar(value="")
+        entry = ttk.Entry(self._body, textvariable=var, width=5)
+        bar = ttk.Progressbar(self._body, orient='horizontal', mode='determinate')
+        bar['maximum'] = 1.0
+        row = {"label": label, "var": var, "entry": entry, "bar": bar, "shown": False}
+        self.rows.append(row)
+        for widget in (label, entry, bar):
+            self._bind_wheel(widget)
+
+        # Bind the entry to update the probability of the excerpt currently shown in this row
+        var.trace_add('write', lambda *args, r=r: self._entry_changed(r))
+        entry.bind("<FocusOut>", lambda event: self.apply_edits())
+
+    def _show_row(self, row, r):
+        if not row["shown"]:
+            row["label"].grid(row=r, column=0, padx=5, pady=2, sticky='w')
+            row["entry"].grid(row=r, column=1, padx=5, pady=2)
+            row["bar"].grid(row=r, column=2, padx=5, pady=2, sticky='ew')
+            row["shown"] = True
+
+    def _hide_row(self, row):
+        if row["shown"]:
+            for widget in (row["label"], row["entry"], row["bar"]):
+                widget.grid_remove()
+            row["shown"] = False
+
+    def _entry_changed(self, r):
+        '''
+        Records the edit and restarts the delay before the pending edits are applied.
+        '''
+        if self._updating:
+            return
+        self.pending[self.first + r] = self.rows[r]["var"].get()
+        if self._after_id is not None:
+            self.frame.after_cancel(self._after_id)
+        self._after_id = self.frame.after(EDIT_DELAY, self.apply_edits)
+
+    def _resized(self, event):
+        '''
+        Creates the rows needed to fill the new height of the frame. Rows are never destroyed, only hidden.
+        '''
+        if self._row_height is None:
+            self._row_height = max(1, self.rows[0]["entry"].winfo_reqheight() + 4)
+        self.visible = max(1, event.height // self._row_height)
+        while len(self.rows) < min(self.visible, len(self.track.input_excerpts.excerpts)):
+            self._add_row()
+        self.first = max(0, min(self.first, len(self.track.input_excerpts.excerpts) - self.visible))
+        self.refresh()
+
+    def _update_scrollbar(self):
+        total = len(self.track.input_excerpts.excerpts)
+        if total == 0:
+            self._scrollbar.set(0, 1)
+        else:
+            self._scrollbar.set(self.first / total, min(1, (self.first + self.visible) / total))
+
+    def _scrollbar_moved(self, action, value, unit=None):
+        if action == "moveto":
+            self.scroll_to(float(value) * len(self.track.input_excerpts.excerpts))
+        elif action == "scroll":
+            step = self.visible if unit == "pages" else 1
+            self.scroll_to(self.first + int(value) * step)
+
+    def _bind_wheel(self, widget):
+        '''
+        Scrolls the table with the mouse wheel (Windows and macOS send MouseWheel, X11 sends buttons 4 and 5).
+        '''
+        widget.bind("<MouseWheel>", lambda event: self.scroll_to(self.first - (1 if event.delta > 0 else -1) * 3))
+        widget.bind("<Button-4>", lambda event: self.scroll_to(self.first - 3))
+        widget.bind("<Button-5>", lambda event: self.scroll_to(self.first + 3))
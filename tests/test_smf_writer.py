@@ -0,0 +1,160 @@
+'''
+Round-trip tests of the direct SMF writer (files/smf_writer.py) against mido: both backends must write the same bytes,
+and mido must parse the result back to the messages of the excerpts.
+'''
+import pytest
+from mido import MidiFile
+from music_generator import Excerpt, ExcerptCollection, Track, Composition, choose_excerpts, export_file, export_bytes, read_seed
+from music_generator.structures.note_message import NOTE_ON, NOTE_OFF
+from music_generator.files.smf_writer import compile_excerpt, encode_track, END_OF_TRACK
+
+
+def make_excerpt(name, messages):
+    excerpt = Excerpt(name)
+    for message in messages:
+        excerpt.add_note(*message)
+    return excerpt
+
+
+def make_collection():
+    '''Excerpts with chords, several channels, note_off and note_on with velocity 0, all one bar long.'''
+    collection = ExcerptCollection("test")
+    collection.add_silence_excerpt()
+    collection.add_excerpt(make_excerpt("chord", [(NOTE_ON, 0, 0, 80, 0), (NOTE_ON, 0, 4, 80, 0), (NOTE_ON, 0, 7, 80, 0),
+                                                  (NOTE_OFF, 0, 0, 0, 1920), (NOTE_OFF, 0, 4, 0, 0), (NOTE_OFF, 0, 7, 0, 0)]))
+    collection.add_excerpt(make_excerpt("melody", [(NOTE_ON, 0, 2, 100, 0), (NOTE_ON, 0, 2, 0, 480), (NOTE_ON, 0, 5, 90, 0),
+                                                   (NOTE_ON, 0, 5, 0, 960), (NOTE_ON, 0, 0, 0, 480)]))
+    collection.add_excerpt(make_excerpt("channels", [(NOTE_ON, 1, 9, 60, 0), (NOTE_ON, 2, 11, 70, 240), (NOTE_OFF, 1, 9, 0, 240),
+                                                     (NOTE_OFF, 2, 11, 0, 1440)]))
+    return collection
+
+
+def make_composition(collection, name="test", bpm=120, length=32, seed=1234, track_names=("Flute", "Violin")):
+    composition = Composition()
+    composition.set_name(name)
+    composition.set_bpm(bpm)
+    composition.set_length(length)
+    composition.set_max_tracks(len(track_names))
+    composition.set_seed(seed)
+    tracks = []
+    for octave, track_name in enumerate(track_names, start=3):
+        track = Track("x", collection)
+        track.set_name(track_name)
+        track.set_octave(octave)
+        track.set_discrete_uniform_probabilities()
+        tracks.append(track)
+    choose_excerpts(composition, tracks)
+    return composition
+
+
+def export_both(tmp_path, composition, seed):
+    paths = {}
+    for backend in ("smf", "mido"):
+        paths[backend] = tmp_path / f"{backend}.mid"
+        export_file(str(paths[backend]), composition, seed, backend)
+    return paths["smf"].read_bytes(), paths["mido"].read_bytes(), paths["smf"]
+
+
+def note_messages(track):
+    return [(msg.type, msg.channel, msg.note, msg.velocity, msg.time) for msg in track if msg.type in ("note_on", "note_off")]
+
+
+def expected_messages(track):
+    expected = []
+    for excerpt in track.excerpts:
+        notes = excerpt.transposed_notes(track.note_shift).tolist()
+        for type_code, channel, note, velocity, time in zip(excerpt.types, excerpt.channels, notes, excerpt.velocities, excerpt.times):
+            expected.append(("note_on" if type_code == NOTE_ON else "note_off", channel, note, velocity, time))
+    return expected
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2**31, 2**63 - 1])
+def test_backends_write_identical_bytes(tmp_path, seed):
+    composition = make_composition(make_collection(), seed=seed)
+    smf_data, mido_data, _ = export_both(tmp_path, composition, seed)
+    assert smf_data == mido_data
+    assert export_bytes(composition, seed) == smf_data
+
+
+def test_mido_parses_the_output(tmp_path):
+    composition = make_composition(make_collection(), length=64)
+    _, _, path = export_both(tmp_path, composition, 1234)
+    mid = MidiFile(str(path))
+    assert mid.ticks_per_beat == 480
+    assert len(mid.tracks) == len(composition.tracks)
+    for midi_track, track in zip(mid.tracks, composition.tracks):
+        assert midi_track.name == track.name
+        assert note_messages(midi_track) == expected_messages(track)
+        program_changes = [msg.program for msg in midi_track if msg.type == "program_change"]
+        assert program_changes == [track.midi_number]
+
+
+@pytest.mark.parametrize("seed", [0, 987654321, 2**63 - 1, 2**64 + 5, 10**30])
+def test_read_seed(tmp_path, seed):
+    composition = make_composition(make_collection(), seed=seed)
+    smf_data, mido_data, path = export_both(tmp_path, composition, seed)
+    assert smf_data == mido_data
+    assert read_seed(str(path)) == seed
+
+
+def test_read_seed_without_seed(tmp_path):
+    composition = make_composition(make_collection())
+    _, _, path = export_both(tmp_path, composition, None)
+    assert read_seed(str(path)) is None
+
+
+def test_running_status_across_excerpts(tmp_path):
+    collection = ExcerptCollection("running")
+    # Both excerpts only use note_on on channel 0, so the second one continues the running status of the first
+    first = make_excerpt("first", [(NOTE_ON, 0, 0, 100, 0), (NOTE_ON, 0, 0, 0, 1920)])
+    second = make_excerpt("second", [(NOTE_ON, 0, 4, 90, 0), (NOTE_ON, 0, 4, 0, 1920)])
+    # This one starts with note_off, so the status byte must be written again
+    third = make_excerpt("third", [(NOTE_OFF, 0, 4, 0, 0), (NOTE_ON, 0, 7, 80, 0), (NOTE_ON, 0, 7, 0, 1920)])
+    for excerpt in (first, second, third):
+        collection.add_excerpt(excerpt)
+
+    compiled = [compile_excerpt(excerpt) for excerpt in (first, second, third)]
+    chunk = encode_track(b'', compiled)
+    expected = compiled[0][2] + compiled[1][3] + compiled[2][2] + END_OF_TRACK
+    assert chunk[8:] == expected
+    assert len(compiled[1][3]) < len(compiled[1][2])
+
+    composition = make_composition(collection, length=48, track_names=("Flute",))
+    smf_data, mido_data, path = export_both(tmp_path, composition, 7)
+    assert smf_data == mido_data
+    assert note_messages(MidiFile(str(path)).tracks[0]) == expected_messages(composition.tracks[0])
+
+
+@pytest.mark.parametrize("bpm", [4, 3.58, 37.5, 120, 999.9, 60000000, 60000001])
+def test_extreme_bpm(tmp_path, bpm):
+    composition = make_composition(make_collection(), bpm=bpm, length=4)
+    smf_data, mido_data, path = export_both(tmp_path, composition, 1)
+    assert smf_data == mido_data
+    tempos = [msg.tempo for msg in MidiFile(str(path)).tracks[0] if msg.type == "set_tempo"]
+    assert tempos == [int(round(60 * 1e6 / bpm))]
+
+
+@pytest.mark.parametrize("bpm", [1, 3])
+def test_bpm_out_of_range(tmp_path, bpm):
+    composition = make_composition(make_collection(), bpm=bpm, length=4)
+    for backend in ("smf", "mido"):
+        with pytest.raises(ValueError):
+            export_file(str(tmp_path / f"{backend}.mid"), composition, 1, backend)
+
+
+@pytest.mark.parametrize("name", ["Flûte à bec", "Flauta 笛", "Скрипка", "🎻"])
+def test_non_latin1_track_names(tmp_path, name):
+    composition = make_composition(make_collection(), track_names=(name, "Violin"))
+    smf_data, mido_data, path = export_both(tmp_path, composition, 1)
+    assert smf_data == mido_data
+    # Characters outside latin-1 are replaced, as mido writes text as latin-1
+    assert MidiFile(str(path)).tracks[0].name == name.encode('latin-1', errors='replace').decode('latin-1')
+
+
+def test_long_composition(tmp_path):
+    composition = make_composition(make_collection(), length=2000, track_names=("Flute", "Violin", "Cello", "Oboe"))
+    smf_data, mido_data, path = export_both(tmp_path, composition, 99)
+    assert smf_data == mido_data
+    mid = MidiFile(str(path))
+    for midi_track, track in zip(mid.tracks, composition.tracks):
+        assert note_messages(midi_track) == expected_messages(track)
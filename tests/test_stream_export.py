@@ -0,0 +1,76 @@
+'''
+Tests that streamed files do not depend on the block size: generate_stream and export_stream must write the same bytes
+as generate() with the same seed, since the file only records the seed.
+'''
+import numpy as np
+import pytest
+from music_generator import (Excerpt, ExcerptCollection, Track, Composition, AliasSampler, PitchClassClash,
+                             generate, generate_stream, export_stream, read_seed)
+from music_generator.structures.note_message import NOTE_ON, NOTE_OFF
+
+
+def make_collection():
+    collection = ExcerptCollection("test")
+    collection.add_silence_excerpt()
+    for note in range(7):
+        excerpt = Excerpt(f"note {note}")
+        excerpt.add_note(NOTE_ON, 0, note, 90, 0)
+        excerpt.add_note(NOTE_OFF, 0, note, 0, 1920)
+        collection.add_excerpt(excerpt)
+    return collection
+
+
+def make_generation(length, seed, markov=False, constraints=()):
+    collection = make_collection()
+    composition = Composition()
+    composition.set_name("stream")
+    composition.set_length(length)
+    composition.set_max_tracks(3)
+    composition.set_seed(seed)
+    composition.set_constraints(list(constraints))
+    tracks = []
+    for n, preset in enumerate(("uniform", "binomial", "zipf")):
+        track = Track("x", collection)
+        track.set_name("Flute")
+        track.set_octave(n + 3)
+        if preset == "uniform":
+            track.set_discrete_uniform_probabilities()
+        elif preset == "binomial":
+            track.set_binomial_probabilities(0.3)
+        else:
+            track.set_zipf_probabilities(1.5)
+        tracks.append(track)
+    if markov:
+        tracks[1].learn_transitions([[1, 2, 3, 1, 2, 4, 5, 1]], order=2)
+    return composition, tracks
+
+
+@pytest.mark.parametrize("length, block_size", [(5000, 4096), (6000, 4096), (1000, 7), (64, 1), (300, 300)])
+def test_generate_stream_matches_generate(tmp_path, length, block_size):
+    composition, tracks = make_generation(length, 9)
+    generate(composition, tracks, str(tmp_path / "full"))
+    composition.set_name("stream")
+    seed = generate_stream(composition, tracks, str(tmp_path / "streamed"), block_size)
+    assert seed == 9
+    full = (tmp_path / "full" / "stream.mid").read_bytes()
+    assert (tmp_path / "streamed" / "stream.mid").read_bytes() == full
+    assert read_seed(str(tmp_path / "streamed" / "stream.mid")) == 9
+
+
+@pytest.mark.parametrize("markov, constraints", [(True, ()), (False, (PitchClassClash(),))])
+def test_export_stream_matches_generate_with_markov_and_constraints(tmp_path, markov, constraints):
+    composition, tracks = make_generation(5000, 3, markov, constraints)
+    generate(composition, tracks, str(tmp_path))
+    full = (tmp_path / "stream.mid").read_bytes()
+    for block_size in (13, 4096):
+        export_stream(str(tmp_path / f"block_{block_size}.mid"), composition, tracks, 3, block_size)
+        assert (tmp_path / f"block_{block_size}.mid").read_bytes() == full
+
+
+def test_draw_k_does_not_depend_on_the_block_size():
+    sampler = AliasSampler([0.1, 0.0, 0.5, 0.25, 0.15])
+    whole = sampler.draw_k(10000, np.random.default_rng(5))
+    rng = np.random.default_rng(5)
+    blocks = np.concatenate([sampler.draw_k(k, rng) for k in (1, 4095, 3, 5901)])
+    assert np.array_equal(whole, blocks)
+    assert not np.any(whole == 1)